@@ -0,0 +1,66 @@
+"""
+Tree-building parse throughput: table-driven DPDAParser vs. the generated
+recursive-descent parser (parser/codegen.py) on the grammars in specs/.
+
+Both parsers allocate the same ParseTreeNode objects, and the cyclic garbage
+collector's passes over them would dominate the timings, so (like timeit)
+the collector is disabled while timing.
+
+Run from TLA_Project/:  python -m benchmarks.bench_codegen
+"""
+import gc
+import time
+
+from benchmarks.synthetic import cpp_source, expression_source
+from parser.codegen import compile_parser
+from parser.compiled_grammar import CompiledGrammar
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def dump(root):
+    """Pre-order records of a tree, without recursion (the trees are deep)."""
+    records = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        records.append((node.symbol, node.value, node.start, node.end, len(node.children)))
+        stack.extend(reversed(node.children))
+    return records
+
+
+def main():
+    cases = [
+        ('../specs/expr_spec.txt', expression_source(20000)),
+        ('../specs/cpp_spec.txt', cpp_source(2000)),
+    ]
+    print(f"{'spec':>24} {'tokens':>8} {'DPDA':>12} {'generated':>12} {'speedup':>8}")
+    for spec_path, source in cases:
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            compiled = CompiledGrammar(f.read())
+        tokens = list(compiled.lexer.tokenize(source))
+        dpda = compiled.parser()
+        generated = compile_parser(compiled.grammar, compiled.table)
+        stream = compiled.lexer.tokenize_columnar(source)
+        assert dump(dpda.parse_with_tree(stream)) == dump(generated(stream))
+
+        table_time = best_of(3, lambda: dpda.parse_with_tree(tokens))
+        generated_time = best_of(3, lambda: generated(tokens))
+        print(f"{spec_path:>24} {len(tokens):>8} {len(tokens) / table_time:>9.0f}t/s"
+              f" {len(tokens) / generated_time:>9.0f}t/s {table_time / generated_time:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Memory and build time of ParseTreeNode trees vs. CompactTree on generated
+programs for specs/cpp_spec.txt.
+
+Run from TLA_Project/:  python -m benchmarks.bench_compact_tree
+"""
+import gc
+import time
+import tracemalloc
+
+from benchmarks.synthetic import cpp_source
+from parser.compact_tree import CompactTree
+from parser.compiled_grammar import CompiledGrammar
+
+
+def measure(func):
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    parser = compiled.parser()
+    print(f"{'tokens':>8} {'nodes':>8} {'tree':>12} {'time':>10} {'bytes/node':>11}")
+    for functions in (200, 2000):
+        tokens = list(compiled.lexer.tokenize(cpp_source(functions)))
+        compact, compact_time, compact_size = measure(lambda: CompactTree.parse(parser, tokens))
+        _, tree_time, tree_size = measure(lambda: parser.parse_with_tree(tokens))
+        nodes = len(compact)
+        for name, elapsed, size in (('ParseTreeNode', tree_time, tree_size),
+                                    ('CompactTree', compact_time, compact_size)):
+            print(f"{len(tokens):>8} {nodes:>8} {name:>12} {elapsed * 1000:>8.1f}ms {size / nodes:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
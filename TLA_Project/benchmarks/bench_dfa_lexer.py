@@ -0,0 +1,92 @@
+"""
+Whole-file lexing: the table-driven DFALexer vs. the alternation-regex Lexer,
+on specs/cpp_spec.txt (a handful of keywords) and on a spec with 60 keyword
+rules, where the regex tries every keyword alternative at each identifier
+while the DFA resolves them with one dict lookup.
+
+Run from TLA_Project/:  python -m benchmarks.bench_dfa_lexer
+"""
+import random
+import time
+
+from benchmarks.synthetic import cpp_source
+from lexer.dfa_lexer import DFALexer
+from lexer.lexer import Lexer
+from parser.compiled_grammar import split_spec
+
+KEYWORD_COUNT = 60
+
+
+def keyword_rules(count):
+    """(name, pattern) rules for `count` keywords ahead of the usual ID, NUM, operator and SKIP rules."""
+    words = [f"{random.Random(i).choice('abcdefghijklmnopqrstuvwxyz')}kw{i}" for i in range(count)]
+    rules = [(word.upper(), word) for word in words]
+    rules += [
+        ('ID', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+        ('NUM', r'\d+'),
+        ('PLUS', r'\+'),
+        ('EQUALS', r'='),
+        ('SEMICOLON', r';'),
+        ('SKIP', r'[ \t\n]+'),
+    ]
+    return words, rules
+
+
+def keyword_source(words, statements, seed=0):
+    """`statements` lines of keywords, identifiers (some sharing a keyword's prefix) and numbers."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(statements):
+        parts = []
+        for _ in range(rng.randint(3, 8)):
+            r = rng.random()
+            if r < 0.4:
+                parts.append(rng.choice(words))
+            elif r < 0.6:
+                parts.append(rng.choice(words) + 'x')
+            elif r < 0.8:
+                parts.append(f"v{rng.randrange(1000)}")
+            else:
+                parts.append(str(rng.randrange(100000)))
+        lines.append(' + '.join(parts) + ';')
+    return '\n'.join(lines)
+
+
+def regex_lexer(rules):
+    """A Lexer over `rules`, with keywords wrapped in \\b so they do not match identifier prefixes."""
+    keywords = {name for name, pattern in rules if pattern.isalnum()}
+    specification = [(name, rf'\b{pattern}\b' if name in keywords else pattern) for name, pattern in rules]
+    specification.append(('MISMATCH', r'.'))
+    return type('KeywordLexer', (Lexer,), {'token_specification': specification})()
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        _, lexer_text = split_spec(f.read())
+    words, rules = keyword_rules(KEYWORD_COUNT)
+    cases = [
+        ('cpp_spec', DFALexer.from_lexer_text(lexer_text), Lexer(), cpp_source(2000)),
+        (f'{KEYWORD_COUNT} keywords', DFALexer(rules), regex_lexer(rules), keyword_source(words, 10000)),
+    ]
+    print(f"{'spec':>12} {'chars':>9} {'tokens':>8} {'regex':>10} {'DFA':>10} {'columnar':>10} {'speedup':>8}")
+    for name, dfa, regex, source in cases:
+        tokens = regex.tokenize(source)
+        assert dfa.tokenize(source) == tokens
+        regex_time = best_of(3, lambda: regex.tokenize(source))
+        dfa_time = best_of(3, lambda: dfa.tokenize(source))
+        columnar_time = best_of(3, lambda: dfa.tokenize_columnar(source))
+        print(f"{name:>12} {len(source):>9} {len(tokens):>8} {regex_time * 1000:>8.1f}ms "
+              f"{dfa_time * 1000:>8.1f}ms {columnar_time * 1000:>8.1f}ms {regex_time / dfa_time:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
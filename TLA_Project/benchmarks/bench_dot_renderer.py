@@ -0,0 +1,35 @@
+"""
+DotRenderer.write_dot() time and DOT size for a parse tree of about 3*10^5
+nodes (a generated program for specs/cpp_spec.txt), drawn in full and
+with depth and node budgets.
+
+Run from TLA_Project/:  python -m benchmarks.bench_dot_renderer
+"""
+import io
+import time
+
+from benchmarks.synthetic import cpp_source
+from parser.compiled_grammar import CompiledGrammar
+from parser.traversal import pre_order
+from visualizer.dot_renderer import DotRenderer
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    tree = compiled.parser().parse_with_tree(compiled.lexer.tokenize_columnar(cpp_source(3000)))
+    print(f"{sum(1 for _ in pre_order(tree))} nodes")
+    print(f"{'renderer':>40} {'time':>10} {'DOT':>10}")
+    for name, renderer in (('full, no collapsing', DotRenderer(collapse_epsilon=False)),
+                           ('epsilon chains collapsed', DotRenderer()),
+                           ('max_depth=12', DotRenderer(max_depth=12)),
+                           ('max_nodes=2000', DotRenderer(max_nodes=2000))):
+        out = io.StringIO()
+        start = time.perf_counter()
+        renderer.write_dot(tree, out)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>40} {elapsed * 1000:>8.0f}ms {len(out.getvalue()) // 1024:>8}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+FIRST/FOLLOW construction: round-robin LL1Helper vs. GraphLL1Helper and
+the bitset variants of it.
+
+Run from TLA_Project/:  python -m benchmarks.bench_first_follow
+"""
+import time
+
+from benchmarks.synthetic import precedence_grammar
+from parser.first_follow import BitsetLL1Helper, GraphLL1Helper
+from parser.grammar import Grammar
+from parser.ll1_table import LL1Helper
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    helpers = [
+        ('LL1Helper', LL1Helper),
+        ('Graph', GraphLL1Helper),
+        ('Bitset/scc', BitsetLL1Helper),
+        ('Bitset/closure', lambda g: BitsetLL1Helper(g, method='closure')),
+    ]
+    print(f"{'levels':>7} {'prods':>7}" + ''.join(f"{name:>16}" for name, _ in helpers))
+    for levels in (10, 50, 100, 200, 400):
+        grammar = Grammar(precedence_grammar(levels))
+        reference = LL1Helper(grammar)
+        repeat = 3 if levels <= 100 else 1
+        row = f"{levels:>7} {len(grammar.split_productions):>7}"
+        for _, helper in helpers:
+            result = helper(grammar)
+            assert dict(result.first) == reference.first and dict(result.follow) == reference.follow
+            row += f"{best_of(repeat, lambda: helper(grammar)) * 1000:>14.1f}ms"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+IncrementalParser.edit() vs. re-lexing and reparsing the whole buffer, for
+edits at random positions in a generated program with 5,000 functions
+(specs/cpp_spec.txt). Every edit changes the length of the text, and
+consecutive edits jump around the buffer, so neither the tokens nor the
+tree can defer the offset shift to one moving point.
+
+Run from TLA_Project/:  python -m benchmarks.bench_incremental_parse
+"""
+import random
+import time
+
+from benchmarks.synthetic import cpp_source
+from parser.compiled_grammar import CompiledGrammar
+from parser.incremental_parse import IncrementalParser
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    parser = compiled.parser()
+    incremental = IncrementalParser(parser, compiled.lexer)
+    document = incremental.parse(cpp_source(5000))
+    source = document.source
+    print(f"{len(source)} characters, {len(document.tokens)} tokens")
+
+    start = time.perf_counter()
+    parser.parse_with_tree(compiled.lexer.tokenize_columnar(source))
+    full_time = time.perf_counter() - start
+
+    rng = random.Random(0)
+    statement = " y = (x + 2) * 3;"
+    times = {'insert statement': [], 'delete statement': [], 'type a digit': []}
+    for _ in range(300):
+        kind = rng.choice(list(times))
+        source = document.source
+        if kind == 'insert statement':
+            # after the end of a statement somewhere in the file
+            offset = source.find(';', rng.randrange(len(source))) + 1
+            edit = (offset, 0, statement)
+        elif kind == 'delete statement':
+            offset = source.find(statement, rng.randrange(len(source)))
+            edit = (offset, len(statement), '')
+        else:
+            # a number literal before a ';' gets one more digit
+            offset = source.find(';', rng.randrange(len(source)))
+            edit = (offset, 0, '7') if source[offset - 1].isdigit() else None
+        if edit is None or edit[0] <= 0:
+            continue
+        start = time.perf_counter()
+        incremental.edit(document, *edit)
+        times[kind].append(time.perf_counter() - start)
+        assert not document.diagnostics
+    for kind, samples in times.items():
+        samples.sort()
+        print(f"{kind:>17}: median {samples[len(samples) // 2] * 1000:.2f}ms, max {samples[-1] * 1000:.2f}ms"
+              f" over {len(samples)} edits (full lex + parse {full_time * 1000:.0f}ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+parse_many() throughput over many small generated programs for
+specs/cpp_spec.txt, in-process (workers=0) and across process pools.
+
+Run from TLA_Project/:  python -m benchmarks.bench_parse_many
+"""
+import os
+import time
+
+from benchmarks.synthetic import cpp_source
+from parser.batch import parse_many
+from parser.compiled_grammar import CompiledGrammar
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    sources = [cpp_source(3, seed) for seed in range(5000)]
+    cpus = os.cpu_count() or 1
+    print(f"{len(sources)} sources, {cpus} CPUs")
+    print(f"{'mode':>10} {'workers':>8} {'chunk':>6} {'files/s':>10}")
+    for mode in ('recognize', 'tree'):
+        for workers in sorted({0, 1, 2, cpus}):
+            for chunk_size in ((1, 32) if workers else (32,)):
+                start = time.perf_counter()
+                results = list(parse_many(sources, compiled, workers=workers, mode=mode, chunk_size=chunk_size))
+                elapsed = time.perf_counter() - start
+                assert all(result.ok for result in results)
+                print(f"{mode:>10} {workers:>8} {chunk_size:>6} {len(sources) / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+DPDAParser.parse_with_tree vs. DPDAParser.recognize on a generated program
+for specs/cpp_spec.txt, with a token list and with a TokenStream.
+
+Run from TLA_Project/:  python -m benchmarks.bench_recognize
+"""
+import time
+import tracemalloc
+
+from benchmarks.synthetic import cpp_source
+from parser.compiled_grammar import CompiledGrammar
+
+
+def measure(func, tokens):
+    start = time.perf_counter()
+    func(tokens)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(tokens)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    parser = compiled.parser()
+    print(f"{'tokens':>8} {'mode':>22} {'time':>10} {'peak mem':>12}")
+    for functions in (200, 2000):
+        stream = compiled.lexer.tokenize_columnar(cpp_source(functions))
+        tokens = list(stream)
+        assert parser.recognize(tokens) == (True, None)
+        for name, func, arg in [
+            ('parse_with_tree/list', parser.parse_with_tree, tokens),
+            ('recognize/list', parser.recognize, tokens),
+            ('recognize/TokenStream', parser.recognize, stream),
+        ]:
+            elapsed, peak = measure(func, arg)
+            print(f"{len(tokens):>8} {name:>22} {elapsed * 1000:>8.1f}ms {peak / 1024:>10.1f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Peak memory and time of parse_with_tree() on a whole file vs.
+DPDAParser.parse_units() on a lazily lexed file, for generated programs
+for specs/cpp_spec.txt of growing size.
+
+Run from TLA_Project/:  python -m benchmarks.bench_streaming_parse
+"""
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import cpp_source
+from parser.compiled_grammar import CompiledGrammar
+
+
+def measure(func):
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    parser = compiled.parser()
+    lexer = compiled.lexer
+
+    def whole(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return parser.parse_with_tree(lexer.tokenize(f.read()))
+
+    def streaming(path):
+        functions = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for _ in parser.parse_units(lexer.tokenize_stream(f)):
+                functions += 1
+        return functions
+
+    print(f"{'functions':>10} {'file':>10} {'mode':>10} {'time':>10} {'peak':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for functions in (1000, 10000):
+            path = os.path.join(directory, f"program_{functions}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                for seed in range(functions // 500):
+                    f.write(cpp_source(500, seed))
+                    f.write('\n')
+            size = os.path.getsize(path)
+            for name, func in (('whole', whole), ('streaming', streaming)):
+                elapsed, peak = measure(lambda: func(path))
+                print(f"{functions:>10} {size // 1024:>8}KB {name:>10} {elapsed * 1000:>8.0f}ms {peak / 1024:>8.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
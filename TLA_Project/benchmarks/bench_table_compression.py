@@ -0,0 +1,66 @@
+"""
+Parse table memory: {(nt, t): rule} dict vs. DenseParseTable vs.
+CompressedParseTable (row displacement, with and without row defaults).
+
+Run from TLA_Project/:  python -m benchmarks.bench_table_compression
+"""
+import random
+import sys
+import time
+
+from benchmarks.synthetic import precedence_grammar
+from parser.compiled_grammar import split_spec
+from parser.first_follow import BitsetLL1Helper
+from parser.grammar import Grammar
+from parser.ll1_table import LL1ParsingTable
+from parser.table_compression import CompressedParseTable
+
+
+def dict_nbytes(table):
+    """Size of the dict, its key tuples and rule strings (shared symbol names excluded)."""
+    size = sys.getsizeof(table)
+    for key, rule in table.items():
+        size += sys.getsizeof(key) + sys.getsizeof(rule)
+    return size
+
+
+def lookup_ns(table, grammar, count=200000):
+    rng = random.Random(0)
+    cells = [(rng.randrange(grammar.terminal_count, len(grammar.symbols)), rng.randrange(grammar.terminal_count))
+             for _ in range(count)]
+    lookup = table.lookup
+    start = time.perf_counter()
+    for nt, t in cells:
+        lookup(nt, t)
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def report(name, grammar):
+    helper = BitsetLL1Helper(grammar)
+    table = LL1ParsingTable(grammar, helper.first, helper.follow)
+    parse_table = table.get_table()
+    dense = table.get_dense_table()
+    exact = CompressedParseTable.from_dense(dense, use_defaults=False)
+    packed = CompressedParseTable.from_dense(dense)
+    for nt in range(grammar.terminal_count, len(grammar.symbols)):
+        for t in range(grammar.terminal_count):
+            assert exact.lookup(nt, t) == dense.lookup(nt, t)
+            if dense.lookup(nt, t) != dense.ERROR:
+                assert packed.lookup(nt, t) == dense.lookup(nt, t)
+    assert CompressedParseTable.from_bytes(packed.to_bytes()).lookup(nt, t) == packed.lookup(nt, t)
+    print(f"{name:>16} {len(grammar.symbols):>7} {dict_nbytes(parse_table):>10} {dense.nbytes():>10}"
+          f" {exact.nbytes():>10} {packed.nbytes():>10}"
+          f" {lookup_ns(dense, grammar):>8.0f}ns {lookup_ns(packed, grammar):>8.0f}ns")
+
+
+def main():
+    print(f"{'grammar':>16} {'symbols':>7} {'dict B':>10} {'dense B':>10} {'comb B':>10} {'comb+def B':>10}"
+          f" {'dense':>10} {'comb':>10}")
+    with open('grammars/cpp_like_grammar.txt', 'r', encoding='utf-8') as f:
+        report('cpp_like', Grammar(split_spec(f.read())[0]))
+    for levels in (50, 200, 400):
+        report(f'precedence/{levels}', Grammar(precedence_grammar(levels)))
+
+
+if __name__ == '__main__':
+    main()
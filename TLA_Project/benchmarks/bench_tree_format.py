@@ -0,0 +1,90 @@
+"""
+Writing and reading a parse tree with pickle vs. parser/tree_format.py
+(binary records, read back whole or walked lazily over mmap) and its
+JSON-lines fallback, for a generated program for specs/cpp_spec.txt.
+
+Run from TLA_Project/:  python -m benchmarks.bench_tree_format
+"""
+import gc
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import cpp_source
+from parser.compiled_grammar import CompiledGrammar
+from parser.tree_format import load_tree, open_tree, read_jsonl, write_jsonl, write_tree
+
+
+def timed(func):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    with open('../specs/cpp_spec.txt', 'r', encoding='utf-8') as f:
+        compiled = CompiledGrammar(f.read())
+    tokens = compiled.lexer.tokenize_columnar(cpp_source(2000))
+    tree = compiled.parser().parse_with_tree(tokens)
+    # pickle recurses once per tree level (Program -> Function Program)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {name: os.path.join(directory, name) for name in ('tree.pickle', 'tree.tlpt', 'tree.jsonl')}
+
+        def pickle_write():
+            with open(paths['tree.pickle'], 'wb') as f:
+                pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def pickle_read():
+            with open(paths['tree.pickle'], 'rb') as f:
+                return pickle.load(f)
+
+        def jsonl_write():
+            with open(paths['tree.jsonl'], 'w', encoding='utf-8') as f:
+                write_jsonl(tree, f)
+
+        def jsonl_read():
+            with open(paths['tree.jsonl'], 'r', encoding='utf-8') as f:
+                return read_jsonl(f)
+
+        def lazy_walk():
+            with open_tree(paths['tree.tlpt']) as stored:
+                return sum(1 for _ in stored.walk())
+
+        def lazy_lookup():
+            # open, then follow the root's last child down the Program chain
+            with open_tree(paths['tree.tlpt']) as stored:
+                node = stored.root
+                while node.children:
+                    node = node.children[-1]
+                return node.symbol
+
+        rows = [
+            ('pickle', 'tree.pickle', pickle_write, pickle_read),
+            ('binary', 'tree.tlpt', lambda: write_tree(tree, paths['tree.tlpt']),
+             lambda: load_tree(paths['tree.tlpt'])),
+            ('jsonl', 'tree.jsonl', jsonl_write, jsonl_read),
+        ]
+        print(f"{len(tokens)} tokens; times in ms, sizes in KB")
+        print(f"{'format':>8} {'size':>8} {'write':>8} {'read':>8}")
+        for name, file_name, write, read in rows:
+            _, write_time = timed(write)
+            _, read_time = timed(read)
+            print(f"{name:>8} {os.path.getsize(paths[file_name]) // 1024:>8} {write_time * 1000:>8.0f}"
+                  f" {read_time * 1000:>8.0f}")
+        nodes, walk_time = timed(lazy_walk)
+        _, lookup_time = timed(lazy_lookup)
+        print(f"binary mmap: walk of {nodes} nodes {walk_time * 1000:.0f}ms,"
+              f" open + descend the last-child chain {lookup_time * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Size, depth, memory and build time of the full parse tree vs. the tree
+built under TreePolicy.for_grammar() on generated programs for
+specs/cpp_spec.txt and specs/expr_spec.txt.
+
+Run from TLA_Project/:  python -m benchmarks.bench_tree_policy
+"""
+import gc
+import time
+import tracemalloc
+
+from benchmarks.synthetic import cpp_source, expression_source
+from parser.compiled_grammar import CompiledGrammar
+from parser.tree_policy import TreePolicy
+
+
+def measure(func):
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def shape(root):
+    """(node count, maximum depth), without recursion."""
+    nodes = 0
+    deepest = 0
+    stack = [(root, 1)]
+    while stack:
+        node, depth = stack.pop()
+        nodes += 1
+        deepest = max(deepest, depth)
+        stack.extend((child, depth + 1) for child in node.children)
+    return nodes, deepest
+
+
+def main():
+    print(f"{'input':>16} {'tokens':>8} {'tree':>8} {'nodes':>8} {'depth':>7} {'time':>10} {'memory':>10}")
+    for spec, name, source in (('cpp', 'cpp/2000', cpp_source(2000)),
+                               ('expr', 'expr/20000', expression_source(20000))):
+        with open(f'../specs/{spec}_spec.txt', 'r', encoding='utf-8') as f:
+            compiled = CompiledGrammar(f.read())
+        parser = compiled.parser()
+        policy = TreePolicy.for_grammar(compiled.grammar)
+        tokens = compiled.lexer.tokenize_columnar(source)
+        for label, tree_policy in (('full', None), ('compact', policy)):
+            tree, elapsed, size = measure(lambda: parser.parse_with_tree(tokens, tree_policy))
+            nodes, depth = shape(tree)
+            print(f"{name:>16} {len(tokens):>8} {label:>8} {nodes:>8} {depth:>7}"
+                  f" {elapsed * 1000:>8.1f}ms {size / 1024:>8.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Generators for large LL(1) grammars and matching inputs, used by the
+benchmarks in this directory.
+"""
+import random
+
+
+def precedence_grammar(levels):
+    """
+    An expression grammar with `levels` binary-operator precedence levels,
+    in the same left-factored shape as grammars/expr_grammar.txt:
+    E0 -> E1 E0_pr, E0_pr -> OP0 E1 E0_pr | eps, ..., and statements
+    `ID EQUALS E0 SEMICOLON` wrapped in a right-recursive Program list.
+    """
+    operators = [f'OP{i}' for i in range(levels)]
+    non_terminals = ['Program', 'Statement'] + [f'E{i}' for i in range(levels + 1)] + [f'E{i}_pr' for i in range(levels)]
+    terminals = ['ID', 'NUM', 'LEFT_PAR', 'RIGHT_PAR', 'EQUALS', 'SEMICOLON'] + operators
+    lines = [
+        'START = Program',
+        f"NON_TERMINALS = {', '.join(non_terminals)}",
+        f"TERMINALS = {', '.join(terminals)}",
+        'Program -> Statement Program | eps',
+        'Statement -> ID EQUALS E0 SEMICOLON',
+    ]
+    for i in range(levels):
+        lines.append(f'E{i} -> E{i + 1} E{i}_pr')
+        lines.append(f'E{i}_pr -> OP{i} E{i + 1} E{i}_pr | eps')
+    lines.append(f'E{levels} -> ID | NUM | LEFT_PAR E0 RIGHT_PAR')
+    return '\n'.join(lines)
+
+
+def precedence_tokens(levels, statements, seed=0):
+    """A random token list accepted by precedence_grammar(levels)."""
+    rng = random.Random(seed)
+    tokens = []
+
+    def expression(depth):
+        if depth < 3 and rng.random() < 0.2:
+            tokens.append(('LEFT_PAR', '('))
+            expression(depth + 1)
+            tokens.append(('RIGHT_PAR', ')'))
+        else:
+            tokens.append(rng.choice([('ID', 'x'), ('NUM', '1')]))
+        if rng.random() < 0.5:
+            tokens.append((f'OP{rng.randrange(levels)}', 'op'))
+            expression(depth)
+
+    for _ in range(statements):
+        tokens.append(('ID', 'v'))
+        tokens.append(('EQUALS', '='))
+        expression(0)
+        tokens.append(('SEMICOLON', ';'))
+    return tokens
+
+
+def expression_source(terms, seed=0):
+    """Source text for specs/expr_spec.txt: one expression with `terms` operands."""
+    rng = random.Random(seed)
+    parts = []
+    depth = 0
+    for i in range(terms):
+        if i:
+            parts.append(rng.choice('+*'))
+        while depth < 20 and rng.random() < 0.1:
+            parts.append('(')
+            depth += 1
+        parts.append(rng.choice(['x', 'y1', '42', '3.5']))
+        while depth and rng.random() < 0.1:
+            parts.append(')')
+            depth -= 1
+    parts.append(')' * depth)
+    return ' '.join(parts)
+
+
+def cpp_source(functions, seed=0):
+    """Source text for specs/cpp_spec.txt with `functions` random functions."""
+    rng = random.Random(seed)
+
+    def expression(depth=0):
+        r = rng.random()
+        if depth > 3 or r < 0.4:
+            return rng.choice(['x', 'y', 'n1', '3', '42', '7.5'])
+        if r < 0.6:
+            return f"({expression(depth + 1)})"
+        return f"{expression(depth + 1)} {rng.choice('+-*/')} {expression(depth + 1)}"
+
+    def statement(depth=0):
+        r = rng.random()
+        if depth > 2 or r < 0.5:
+            return f"{rng.choice('xyz')} = {expression()};"
+        if r < 0.7:
+            return f"return {expression()};"
+        body = ' '.join(statement(depth + 1) for _ in range(rng.randint(0, 3)))
+        return f"{rng.choice(['if', 'while'])} ({expression()}) {{ {body} }}"
+
+    return '\n'.join(
+        f"function f{i}() {{ {' '.join(statement() for _ in range(rng.randint(0, 4)))} }}"
+        for i in range(functions)
+    )
@@ -0,0 +1,481 @@
+from bisect import bisect_right
+
+from lexer.lexer import LexerError, iter_matches
+from lexer.token_stream import TokenStream
+
+MAX_CODE_POINT = 0x10FFFF
+# characters below this have their class cached in DFALexer.class_of once seen
+CACHED_CODE_POINTS = 0x800
+
+DIGIT = [(ord('0'), ord('9'))]
+WORD = [(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('_'), ord('_')), (ord('a'), ord('z'))]
+SPACE = [(ord('\t'), ord('\r')), (ord(' '), ord(' '))]
+ANY_BUT_NEWLINE = [(0, ord('\n') - 1), (ord('\n') + 1, MAX_CODE_POINT)]
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', '0': '\0'}
+
+
+def normalize(intervals):
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            if hi > merged[-1][1]:
+                merged[-1] = (merged[-1][0], hi)
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def negate(intervals):
+    result = []
+    start = 0
+    for lo, hi in normalize(intervals):
+        if lo > start:
+            result.append((start, lo - 1))
+        start = hi + 1
+    if start <= MAX_CODE_POINT:
+        result.append((start, MAX_CODE_POINT))
+    return result
+
+
+class RegexSyntaxParser:
+    """
+    Parses the regex subset used by lexer specs into a small AST:
+    ('set', intervals), ('cat', items), ('alt', items), ('star', node),
+    ('plus', node), ('opt', node) and ('eps',). The \\d, \\w and \\s classes
+    are the ASCII ones.
+
+    Word boundaries (\\b) are accepted and ignored: keywords are resolved by
+    DFALexer after an identifier has been matched, which gives the same result.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.pos = 0
+
+    def parse(self):
+        node = self._parse_alt()
+        if self.pos != len(self.pattern):
+            raise ValueError(f"Unbalanced ')' in pattern: {self.pattern}")
+        return node
+
+    def _peek(self):
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def _next(self):
+        if self.pos >= len(self.pattern):
+            raise ValueError(f"Unexpected end of pattern: {self.pattern}")
+        ch = self.pattern[self.pos]
+        self.pos += 1
+        return ch
+
+    def _parse_alt(self):
+        items = [self._parse_cat()]
+        while self._peek() == '|':
+            self.pos += 1
+            items.append(self._parse_cat())
+        return items[0] if len(items) == 1 else ('alt', items)
+
+    def _parse_cat(self):
+        items = []
+        while self._peek() is not None and self._peek() not in '|)':
+            items.append(self._parse_repeat())
+        if not items:
+            return ('eps',)
+        return items[0] if len(items) == 1 else ('cat', items)
+
+    def _parse_repeat(self):
+        node = self._parse_atom()
+        while True:
+            ch = self._peek()
+            if ch == '*':
+                self.pos += 1
+                node = ('star', node)
+            elif ch == '+':
+                self.pos += 1
+                node = ('plus', node)
+            elif ch == '?':
+                self.pos += 1
+                node = ('opt', node)
+            elif ch == '{' and self._looks_like_counter():
+                node = self._parse_counter(node)
+            else:
+                return node
+            if self._peek() == '?':
+                # lazy quantifiers make no difference for longest match
+                self.pos += 1
+
+    def _looks_like_counter(self):
+        end = self.pattern.find('}', self.pos)
+        if end == -1:
+            return False
+        body = self.pattern[self.pos + 1:end]
+        return bool(body) and all(part.isdigit() or part == '' for part in body.split(',', 1)) and body[0].isdigit()
+
+    def _parse_counter(self, node):
+        end = self.pattern.find('}', self.pos)
+        body = self.pattern[self.pos + 1:end]
+        self.pos = end + 1
+        if ',' in body:
+            low, high = body.split(',', 1)
+            low = int(low)
+            high = int(high) if high else None
+        else:
+            low = high = int(body)
+        items = [node] * low
+        if high is None:
+            items.append(('star', node))
+        else:
+            items.extend([('opt', node)] * (high - low))
+        if not items:
+            return ('eps',)
+        return ('cat', items)
+
+    def _parse_atom(self):
+        ch = self._next()
+        if ch == '(':
+            if self.pattern.startswith('?:', self.pos):
+                self.pos += 2
+            elif self._peek() == '?':
+                raise ValueError(f"Unsupported group syntax in pattern: {self.pattern}")
+            node = self._parse_alt()
+            if self._next() != ')':
+                raise ValueError(f"Missing ')' in pattern: {self.pattern}")
+            return node
+        if ch == '[':
+            return ('set', self._parse_class())
+        if ch == '.':
+            return ('set', ANY_BUT_NEWLINE)
+        if ch == '\\':
+            return self._parse_escape(in_class=False)
+        if ch in '^$':
+            raise ValueError(f"Anchors are not supported in lexer patterns: {self.pattern}")
+        return ('set', [(ord(ch), ord(ch))])
+
+    def _parse_escape(self, in_class):
+        ch = self._next()
+        classes = {'d': DIGIT, 'w': WORD, 's': SPACE}
+        if ch in classes:
+            return ('set', classes[ch])
+        if ch.lower() in classes:
+            return ('set', negate(classes[ch.lower()]))
+        if ch in 'bB' and not in_class:
+            return ('eps',)
+        if ch == 'x':
+            code = int(self.pattern[self.pos:self.pos + 2], 16)
+            self.pos += 2
+            return ('set', [(code, code)])
+        literal = ESCAPES.get(ch, ch)
+        return ('set', [(ord(literal), ord(literal))])
+
+    def _parse_class_item(self):
+        ch = self._next()
+        if ch == '\\':
+            return self._parse_escape(in_class=True)[1]
+        return [(ord(ch), ord(ch))]
+
+    def _parse_class(self):
+        negated = False
+        if self._peek() == '^':
+            negated = True
+            self.pos += 1
+        intervals = []
+        first = True
+        while first or self._peek() != ']':
+            if self._peek() is None:
+                raise ValueError(f"Missing ']' in pattern: {self.pattern}")
+            first = False
+            item = self._parse_class_item()
+            if (len(item) == 1 and item[0][0] == item[0][1] and self._peek() == '-'
+                    and self.pos + 1 < len(self.pattern) and self.pattern[self.pos + 1] != ']'):
+                self.pos += 1
+                upper = self._parse_class_item()
+                intervals.append((item[0][0], upper[0][1]))
+            else:
+                intervals.extend(item)
+        self.pos += 1
+        intervals = normalize(intervals)
+        return negate(intervals) if negated else intervals
+
+
+def literal_text(node):
+    """Return the string a pattern matches if it matches exactly one string."""
+    kind = node[0]
+    if kind == 'eps':
+        return ''
+    if kind == 'set' and len(node[1]) == 1 and node[1][0][0] == node[1][0][1]:
+        return chr(node[1][0][0])
+    if kind == 'cat':
+        parts = [literal_text(item) for item in node[1]]
+        if None not in parts:
+            return ''.join(parts)
+    return None
+
+
+class NFA:
+    def __init__(self):
+        self.epsilon = []
+        self.edges = []
+        self.accept = {}
+
+    def new_state(self):
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.epsilon) - 1
+
+    def build(self, node):
+        kind = node[0]
+        start = self.new_state()
+        if kind == 'eps':
+            return start, start
+        if kind == 'set':
+            end = self.new_state()
+            self.edges[start].append((node[1], end))
+            return start, end
+        if kind == 'cat':
+            current = start
+            for item in node[1]:
+                s, e = self.build(item)
+                self.epsilon[current].append(s)
+                current = e
+            return start, current
+        if kind == 'alt':
+            end = self.new_state()
+            for item in node[1]:
+                s, e = self.build(item)
+                self.epsilon[start].append(s)
+                self.epsilon[e].append(end)
+            return start, end
+        s, e = self.build(node[1])
+        end = self.new_state()
+        self.epsilon[start].append(s)
+        self.epsilon[e].append(end)
+        if kind in ('star', 'opt'):
+            self.epsilon[start].append(end)
+        if kind in ('star', 'plus'):
+            self.epsilon[e].append(s)
+        return start, end
+
+    def closure(self, states):
+        stack = list(states)
+        seen = set(states)
+        while stack:
+            for target in self.epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+
+class DFALexer:
+    """
+    Table-driven lexer compiled from an ordered list of (name, pattern) rules.
+
+    All rules are merged into a single deterministic automaton over character
+    classes, so each input character costs one table lookup regardless of how
+    many rules the spec has. Tokens are chosen by longest match; on a tie the
+    rule listed first wins. Keyword rules that are plain words also matched by
+    a later rule (e.g. FUNCTION and ID) are not compiled into the automaton; they are
+    resolved with a dict lookup on the matched text instead.
+    """
+
+    def __init__(self, token_specs, skip=('SKIP', 'WHITESPACE'), error='MISMATCH'):
+        self.token_specs = list(token_specs)
+        self.skip = set(skip)
+        self.error = error
+        self.names = [name for name, _ in self.token_specs]
+        self.keywords = {}
+        trees = [RegexSyntaxParser(pattern).parse() for _, pattern in self.token_specs]
+
+        literals = {}
+        general = []
+        for index, tree in enumerate(trees):
+            text = literal_text(tree)
+            if text and text.replace('_', 'a').isalnum():
+                literals[index] = text
+            else:
+                general.append(index)
+        self._compile(trees, general)
+        compiled = list(general)
+        for index, text in literals.items():
+            rule, length = self._run(text, 0)
+            if length != len(text) or rule == -1:
+                compiled.append(index)
+            elif rule > index:
+                self.keywords.setdefault(rule, {}).setdefault(text, index)
+        if len(compiled) != len(general):
+            self._compile(trees, sorted(compiled))
+
+    def _compile(self, trees, rule_indexes):
+        nfa = NFA()
+        start = nfa.new_state()
+        for index in rule_indexes:
+            s, e = nfa.build(trees[index])
+            nfa.epsilon[start].append(s)
+            nfa.accept[e] = min(index, nfa.accept.get(e, index))
+
+        points = set()
+        for edges in nfa.edges:
+            for intervals, _ in edges:
+                for lo, hi in intervals:
+                    points.add(lo)
+                    points.add(hi + 1)
+        self.points = sorted(points)
+        point_index = {point: i for i, point in enumerate(self.points)}
+        self.class_count = len(self.points) + 1
+        class_edges = []
+        for edges in nfa.edges:
+            expanded = []
+            for intervals, target in edges:
+                for lo, hi in intervals:
+                    expanded.append((point_index[lo] + 1, point_index[hi + 1] + 1, target))
+            class_edges.append(expanded)
+
+        initial = nfa.closure([start])
+        state_ids = {initial: 0}
+        pending = [initial]
+        self.transitions = []
+        self.accepting = []
+        for current in pending:
+            moves = [set() for _ in range(self.class_count)]
+            for nfa_state in current:
+                for first, last, target in class_edges[nfa_state]:
+                    for cls in range(first, last):
+                        moves[cls].add(target)
+            row = [-1] * self.class_count
+            for cls, targets in enumerate(moves):
+                if not targets:
+                    continue
+                subset = nfa.closure(targets)
+                if subset not in state_ids:
+                    state_ids[subset] = len(state_ids)
+                    pending.append(subset)
+                row[cls] = state_ids[subset]
+            self.transitions.append(row)
+            rules = [nfa.accept[s] for s in current if s in nfa.accept]
+            self.accepting.append(min(rules) if rules else -1)
+        self.class_of = {chr(c): bisect_right(self.points, c) for c in range(128)}
+
+    def _char_class(self, ch):
+        cls = self.class_of.get(ch)
+        if cls is None:
+            code_point = ord(ch)
+            cls = bisect_right(self.points, code_point)
+            if code_point < CACHED_CODE_POINTS:
+                self.class_of[ch] = cls
+        return cls
+
+    def _run(self, text, pos):
+        """Longest match starting at pos: returns (rule index, end) or (-1, pos)."""
+        transitions = self.transitions
+        accepting = self.accepting
+        class_of = self.class_of
+        row = transitions[0]
+        rule = accepting[0]
+        end = pos
+        i = pos
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            cls = class_of.get(ch)
+            if cls is None:
+                cls = self._char_class(ch)
+            state = row[cls]
+            if state < 0:
+                break
+            row = transitions[state]
+            i += 1
+            if accepting[state] >= 0:
+                rule = accepting[state]
+                end = i
+        return rule, end
+
+    def _match(self, text, pos):
+        rule, end = self._run(text, pos)
+        if rule < 0 or end == pos:
+            return None, end
+        keywords = self.keywords.get(rule)
+        if keywords:
+            rule = keywords.get(text[pos:end], rule)
+        return self.names[rule], end
+
+    def tokenize(self, code):
+        return [(kind, code[start:end]) for kind, start, end in self.scan(code)]
+
+    def scan(self, code, pos=0):
+        """Yield (kind, start, end) for every non-skipped token from `pos` on."""
+        # _match() inlined: this loop is where whole-file lexing spends its time
+        transitions = self.transitions
+        accepting = self.accepting
+        class_of = self.class_of
+        char_class = self._char_class
+        keywords = self.keywords
+        names = self.names
+        skip = self.skip
+        error = self.error
+        initial = accepting[0]
+        n = len(code)
+        while pos < n:
+            row = transitions[0]
+            rule = initial
+            end = i = pos
+            while i < n:
+                ch = code[i]
+                cls = class_of.get(ch)
+                if cls is None:
+                    cls = char_class(ch)
+                state = row[cls]
+                if state < 0:
+                    break
+                row = transitions[state]
+                i += 1
+                if accepting[state] >= 0:
+                    rule = accepting[state]
+                    end = i
+            if rule < 0 or end == pos:
+                raise LexerError(code[pos], pos, code)
+            if rule in keywords:
+                rule = keywords[rule].get(code[pos:end], rule)
+            kind = names[rule]
+            if kind == error:
+                raise LexerError(code[pos], pos, code)
+            if kind not in skip:
+                yield kind, pos, end
+            pos = end
+
+    def tokenize_stream(self, source, chunk_size=1 << 16, lookahead=256):
+        """
+        Lazily yield (kind, value) tokens from a str, file object or mmap,
+        keeping only a window of the input in memory (see
+        lexer.lexer.iter_matches). Tokens may be of any length, but the DFA
+        must not run more than `lookahead` characters past the end of a token
+        before it fails (as in "1e+" before a non-digit); a longer overrun
+        could reach past the buffered text and change the match.
+        """
+        error = self.error
+        skip = self.skip
+        for kind, value, offset in iter_matches(self._match, source, chunk_size, lookahead):
+            if kind == error:
+                raise LexerError(value[0], offset)
+            if kind not in skip:
+                yield kind, value
+
+    def tokenize_columnar(self, code):
+        stream = TokenStream(code, self.names)
+        kind_ids = stream.kind_ids
+        for kind, start, end in self.scan(code):
+            stream.append(kind_ids[kind], start, end)
+        return stream
+
+    @classmethod
+    def from_lexer_text(cls, lexer_text, **kwargs):
+        """Build a DFALexer from the `# === LEXER ===` section of a spec file."""
+        rules = []
+        for line in lexer_text.splitlines():
+            line = line.strip()
+            if '->' in line and not line.startswith('#'):
+                name, pattern = map(str.strip, line.split('->', 1))
+                if pattern.startswith('/') and pattern.endswith('/'):
+                    pattern = pattern[1:-1]
+                rules.append((name, pattern))
+        return cls(rules, **kwargs)
@@ -0,0 +1,117 @@
+from lexer.lexer import LexerError
+from lexer.text_buffer import TextBuffer
+
+
+class IncrementalLexer:
+    """
+    Keeps a TokenStream up to date with text edits without re-lexing the
+    whole buffer.
+
+    Works with any lexer that provides tokenize_columnar() and scan()
+    (Lexer, DFALexer). Lexing is restarted one token before the edit and
+    stops as soon as a new token after the edit matches an old token (same
+    kind and shifted span): from that point on the old tokens are still valid
+    and only their offsets move.
+
+    Only a slice of the text around the edit is lexed: `context` characters
+    before the restart point (for rules that look behind, like \\b), and
+    from `window` characters past the edit on, quadrupling the window while
+    no old token lines up. A token ending within `lookahead` characters of
+    the end of the slice may still change with more text, so it counts as
+    not lined up; rules must not look further ahead than that.
+    """
+
+    def __init__(self, lexer, context=64, lookahead=256, window=4096):
+        self.lexer = lexer
+        self.context = context
+        self.lookahead = lookahead
+        self.window = window
+
+    def tokenize(self, code):
+        return self.lexer.tokenize_columnar(code)
+
+    def apply_edit(self, stream, offset, deleted, inserted):
+        """
+        Apply an edit (replace `deleted` characters at `offset` with `inserted`)
+        to `stream` in place. The first edit turns `stream.source` into a
+        TextBuffer, so later edits do not copy the whole text.
+
+        Returns (stream, (first, old_stop, new_stop)): tokens [first, old_stop)
+        of the old stream were replaced by tokens [first, new_stop) of the new
+        one; everything else is unchanged apart from shifted offsets. A
+        LexerError leaves `stream` unchanged.
+        """
+        source = stream.source
+        if offset < 0 or offset + deleted > len(source):
+            raise ValueError(f'Edit out of range: offset={offset}, deleted={deleted}')
+        if not isinstance(source, TextBuffer):
+            source = TextBuffer(source)
+        delta = len(inserted) - deleted
+        old_edit_end = offset + deleted
+
+        # one token of look-behind: a token ending right before the edit may
+        # have been cut short by the character that was just changed
+        first = max(stream.find(offset) - 1, 0)
+        restart = min(stream.start(first), offset) if first < len(stream) else 0
+        stop = first
+        count = len(stream)
+        while stop < count and stream.start(stop) < old_edit_end:
+            stop += 1
+
+        relexed = None
+        window = self.window
+        while relexed is None:
+            relexed = self._relex(stream, source, offset, inserted, old_edit_end, restart, stop, window)
+            window *= 4
+        kinds, starts, ends, stop = relexed
+
+        source.replace(offset, deleted, inserted)
+        stream.source = source
+        stream.replace(first, stop, kinds, starts, ends)
+        stream.shift(first + len(kinds), delta)
+        return stream, (first, stop, first + len(kinds))
+
+    def _relex(self, stream, source, offset, inserted, old_edit_end, restart, stop, window):
+        """
+        Lex the new text from `restart` until a token lines up with an old
+        one again, in a slice of it reaching `window` characters past the
+        edit. Returns (kinds, starts, ends, old stop), or None when the
+        slice ended too early to tell.
+        """
+        delta = len(inserted) - (old_edit_end - offset)
+        new_edit_end = offset + len(inserted)
+        base = max(restart - self.context, 0)
+        tail = min(old_edit_end + window, len(source))
+        at_end = tail == len(source)
+        text = source[base:offset] + inserted + source[old_edit_end:tail]
+        limit = base + len(text) - (0 if at_end else self.lookahead)
+
+        kinds, starts, ends = [], [], []
+        kind_ids = stream.kind_ids
+        count = len(stream)
+        try:
+            for kind, start, end in self.lexer.scan(text, restart - base):
+                start += base
+                end += base
+                if end > limit:
+                    return None
+                if start >= new_edit_end:
+                    old_start = start - delta
+                    while stop < count and stream.start(stop) < old_start:
+                        stop += 1
+                    if (stop < count and stream.start(stop) == old_start
+                            and stream.end(stop) == end - delta
+                            and stream.kinds[stop] == kind_ids[kind]):
+                        return kinds, starts, ends, stop
+                kinds.append(kind_ids[kind])
+                starts.append(start)
+                ends.append(end)
+        except LexerError as e:
+            if base + e.offset >= limit:
+                return None
+            new_source = str(source)
+            new_source = new_source[:offset] + inserted + new_source[old_edit_end:]
+            raise LexerError(e.char, base + e.offset, new_source) from None
+        if not at_end:
+            return None
+        return kinds, starts, ends, count
@@ -1,5 +1,17 @@
+import codecs
 import re
 
+from lexer.positions import LineIndex
+from lexer.token_stream import TokenStream
+
+
+class LexerError(RuntimeError):
+    def __init__(self, char, offset, source=None):
+        self.char = char
+        self.offset = offset
+        where = LineIndex(source).describe(offset) if source is not None else f'offset {offset}'
+        super().__init__(f'Unexpected character: {char} at {where}')
+
 class Lexer:
     token_specification = [
         ('FUNCTION', r'\bfunction\b'),
@@ -36,6 +48,109 @@ class Lexer:
             if kind == 'SKIP':
                 continue
             elif kind == 'MISMATCH':
-                raise RuntimeError(f'Unexpected character: {value}')
+                raise LexerError(value, mo.start(), code)
             tokens.append((kind, value))
         return tokens
+
+    def scan(self, code, pos=0):
+        """Yield (kind, start, end) for every non-skipped token from `pos` on."""
+        for mo in self.regex.finditer(code, pos):
+            kind = mo.lastgroup
+            if kind == 'SKIP':
+                continue
+            elif kind == 'MISMATCH':
+                raise LexerError(mo.group(), mo.start(), code)
+            yield kind, mo.start(), mo.end()
+
+    def tokenize_columnar(self, code):
+        stream = TokenStream(code, [name for name, _ in self.token_specification])
+        kind_ids = stream.kind_ids
+        for kind, start, end in self.scan(code):
+            stream.append(kind_ids[kind], start, end)
+        return stream
+
+    def tokenize_stream(self, source, chunk_size=1 << 16, lookahead=256):
+        for kind, value, offset in iter_matches(regex_matcher(self.regex), source, chunk_size, lookahead):
+            if kind == 'SKIP':
+                continue
+            elif kind == 'MISMATCH':
+                raise LexerError(value, offset)
+            yield (kind, value)
+
+
+def read_chunks(source, chunk_size):
+    """Yield text chunks from a str, a text/binary file object or an mmap."""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            yield chunk
+            continue
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def regex_matcher(regex):
+    """Adapt a compiled regex of named groups to the `match` function iter_matches() takes."""
+    def match(text, pos):
+        mo = regex.match(text, pos)
+        if mo is None:
+            return None, pos
+        return mo.lastgroup, mo.end()
+    return match
+
+
+def iter_matches(match, source, chunk_size=1 << 16, lookahead=256):
+    """
+    Lazily tokenize `source`, yielding (kind, text, offset) for every match,
+    skipped kinds included. `match(text, pos)` returns (kind, end) for the
+    token at pos, with kind None when nothing matches there.
+
+    Only a small window of the input is kept in memory. A match that ends
+    within `lookahead` characters of the end of the buffered text may still
+    grow (or match differently) once more input arrives, so it is held back
+    until the next chunk is read or the input is exhausted. The character
+    before `pos` is kept in the buffer, so rules that look behind (like \\b)
+    see the same text as when the whole input is matched at once.
+    """
+    chunks = read_chunks(source, chunk_size)
+    buffer = ''
+    base = 0
+    pos = 0
+    eof = False
+    while True:
+        if not eof:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                keep = min(pos, 1)
+                base += pos - keep
+                buffer = buffer[pos - keep:] + chunk
+                pos = keep
+        limit = len(buffer) if eof else len(buffer) - lookahead
+        while pos < len(buffer):
+            kind, end = match(buffer, pos)
+            if end >= limit and not eof:
+                break
+            if kind is None:
+                raise LexerError(buffer[pos], base + pos)
+            if end == pos:
+                raise RuntimeError(f'Empty match at offset {base + pos}')
+            yield (kind, buffer[pos:end], base + pos)
+            pos = end
+        if eof:
+            return
@@ -0,0 +1,35 @@
+from bisect import bisect_right
+
+
+class LineIndex:
+    """
+    Maps character (or byte) offsets of one source to 1-based line/column
+    pairs. The table of line starts is built on the first lookup only, so
+    tokens and tree nodes can carry plain offsets and pay for line numbers
+    only when a diagnostic actually needs them.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._line_starts = None
+
+    @property
+    def line_starts(self):
+        if self._line_starts is None:
+            newline = '\n' if isinstance(self.source, str) else b'\n'
+            starts = [0]
+            pos = self.source.find(newline)
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = self.source.find(newline, pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def line_col(self, offset):
+        starts = self.line_starts
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def describe(self, offset):
+        line, col = self.line_col(offset)
+        return f'line {line}, column {col}'
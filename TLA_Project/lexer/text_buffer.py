@@ -0,0 +1,88 @@
+from bisect import bisect_right
+
+
+class TextBuffer:
+    """
+    Editable text kept as a list of chunks of about `chunk_size` characters,
+    so an edit rebuilds the one or two chunks it touches instead of copying
+    the whole text. Slicing returns a str, and str() joins the chunks once
+    per edit (the result is cached).
+    """
+
+    def __init__(self, text, chunk_size=4096):
+        self.chunk_size = chunk_size
+        self.chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or ['']
+        self.offsets = []  # start offset of each chunk
+        offset = 0
+        for chunk in self.chunks:
+            self.offsets.append(offset)
+            offset += len(chunk)
+        self.length = len(text)
+        self._text = text
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(self.chunks)
+        return self._text
+
+    def _chunk_at(self, offset):
+        """Index of the chunk holding `offset` (the last chunk for the end of the text)."""
+        return max(bisect_right(self.offsets, offset) - 1, 0)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            if key < 0:
+                key += self.length
+            if not 0 <= key < self.length:
+                raise IndexError('TextBuffer index out of range')
+            i = self._chunk_at(key)
+            return self.chunks[i][key - self.offsets[i]]
+        start, stop, step = key.indices(self.length)
+        if self._text is not None or step != 1:
+            return str(self)[key]
+        if start >= stop:
+            return ''
+        chunks = self.chunks
+        offsets = self.offsets
+        i = self._chunk_at(start)
+        pieces = []
+        while start < stop:
+            base = offsets[i]
+            chunk = chunks[i]
+            pieces.append(chunk[start - base:stop - base])
+            start = base + len(chunk)
+            i += 1
+        return ''.join(pieces)
+
+    def replace(self, offset, deleted, inserted):
+        """Replace `deleted` characters at `offset` with `inserted`."""
+        if offset < 0 or offset + deleted > self.length:
+            raise ValueError(f'Edit out of range: offset={offset}, deleted={deleted}')
+        chunks = self.chunks
+        offsets = self.offsets
+        first = self._chunk_at(offset)
+        last = self._chunk_at(offset + deleted)
+        text = (chunks[first][:offset - offsets[first]] + inserted
+                + chunks[last][offset + deleted - offsets[last]:])
+        size = self.chunk_size
+        if len(text) > 2 * size:
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        elif text or len(chunks) == last - first + 1:
+            pieces = [text]
+        else:
+            pieces = []
+        chunks[first:last + 1] = pieces
+        offset = offsets[first]
+        new_offsets = []
+        for chunk in pieces:
+            new_offsets.append(offset)
+            offset += len(chunk)
+        delta = len(inserted) - deleted
+        offsets[first:last + 1] = new_offsets
+        for i in range(first + len(pieces), len(offsets)):
+            offsets[i] += delta
+        self.length += delta
+        self._text = None
@@ -0,0 +1,229 @@
+from array import array
+from bisect import bisect_left
+
+from lexer.text_buffer import TextBuffer
+
+BLOCK_BITS = 6
+BLOCK_SIZE = 1 << BLOCK_BITS
+
+
+class ShiftTree:
+    """
+    Pending offset deltas of a sequence of items (tokens, tree units) in a
+    Fenwick tree: moving every item from an index on, and reading the delta
+    of one item, both take O(log n).
+    """
+
+    def __init__(self, deltas):
+        n = len(deltas)
+        tree = [0] * (n + 1)
+        previous = 0
+        for i, delta in enumerate(deltas, 1):
+            tree[i] = delta - previous
+            previous = delta
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, index, delta):
+        """Move items index, index + 1, ... by `delta`."""
+        tree = self.tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def delta(self, index):
+        tree = self.tree
+        total = 0
+        i = index + 1
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class TokenStream:
+    """
+    Columnar token storage: kind IDs in an array('H'), start/end offsets in
+    array('i') and a reference to the source buffer. Token values are sliced
+    out of the source only when they are asked for.
+
+    Iterating yields (kind, value) tuples, so a TokenStream can be passed
+    anywhere a list of tokens is expected. When the source is bytes or an
+    mmap, offsets are byte offsets and values are decoded as UTF-8.
+
+    After an edit, offsets are stored without their pending delta, which is
+    kept per block of BLOCK_SIZE tokens in a ShiftTree: shifting the tokens
+    after an edit rewrites at most one block, and reading an offset adds the
+    delta of its block. Iterating applies every pending delta (see flush()).
+    """
+
+    def __init__(self, source, kind_names):
+        self.source = source
+        self.kind_names = list(kind_names)
+        self.kind_ids = {name: i for i, name in enumerate(self.kind_names)}
+        self.kinds = array('H')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.shifts = None  # ShiftTree over blocks, None when nothing is pending
+        self.breaks = []  # blocks whose delta may differ from the previous block's
+
+    def append(self, kind_id, start, end):
+        if self.shifts is not None:
+            self.flush()
+        self.kinds.append(kind_id)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, index):
+        return self.kind_names[self.kinds[index]]
+
+    def start(self, index):
+        if self.shifts is None:
+            return self.starts[index]
+        if index < 0:
+            index += len(self.kinds)
+        return self.starts[index] + self.shifts.delta(index >> BLOCK_BITS)
+
+    def end(self, index):
+        if self.shifts is None:
+            return self.ends[index]
+        if index < 0:
+            index += len(self.kinds)
+        return self.ends[index] + self.shifts.delta(index >> BLOCK_BITS)
+
+    def span(self, index):
+        return self.start(index), self.end(index)
+
+    def value(self, index):
+        text = self.source[self.start(index):self.end(index)]
+        if not isinstance(text, str):
+            text = bytes(text).decode('utf-8')
+        return text
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.kind(index), self.value(index)
+
+    def __iter__(self):
+        self.flush()
+        names = self.kind_names
+        source = self.source
+        if isinstance(source, TextBuffer):
+            source = str(source)
+        if isinstance(source, str):
+            for kind, start, end in zip(self.kinds, self.starts, self.ends):
+                yield names[kind], source[start:end]
+        else:
+            for i in range(len(self.kinds)):
+                yield self[i]
+
+    @staticmethod
+    def _add(column, first, stop, delta):
+        column[first:stop] = array(column.typecode, [value + delta for value in column[first:stop]])
+
+    def shift(self, index, delta):
+        """
+        Move the offsets of every token from `index` on by `delta`: the rest
+        of index's block is rewritten, the later blocks get a pending delta.
+        """
+        count = len(self.kinds)
+        if not delta or index >= count:
+            return
+        if self.shifts is None:
+            self.shifts = ShiftTree([0] * (2 * (count >> BLOCK_BITS) + 2))
+        block = index >> BLOCK_BITS
+        if index & (BLOCK_SIZE - 1):
+            stop = min((block + 1) << BLOCK_BITS, count)
+            self._add(self.starts, index, stop, delta)
+            self._add(self.ends, index, stop, delta)
+            block += 1
+        if block << BLOCK_BITS < count:
+            self.shifts.add(block, delta)
+            breaks = self.breaks
+            i = bisect_left(breaks, block)
+            if block and (i == len(breaks) or breaks[i] != block):
+                breaks.insert(i, block)
+
+    def flush(self):
+        """Apply every pending offset shift to the stored tokens."""
+        shifts = self.shifts
+        if shifts is None:
+            return
+        count = len(self.kinds)
+        for block in range((count + BLOCK_SIZE - 1) >> BLOCK_BITS):
+            delta = shifts.delta(block)
+            if delta:
+                first = block << BLOCK_BITS
+                stop = min(first + BLOCK_SIZE, count)
+                self._add(self.starts, first, stop, delta)
+                self._add(self.ends, first, stop, delta)
+        self.shifts = None
+        self.breaks = []
+
+    def _carry(self, stop, count, moved):
+        """
+        Keep the offsets of tokens [stop, count) when they move by `moved`
+        indexes: a token that crosses into another block takes the
+        difference between the two blocks' deltas into its stored offsets.
+        """
+        delta = self.shifts.delta
+        breaks = self.breaks
+        for k in breaks[bisect_left(breaks, (stop + min(moved, 0)) >> BLOCK_BITS):]:
+            boundary = k << BLOCK_BITS
+            step = delta(k) - delta(k - 1)
+            if not step:
+                continue
+            if moved > 0:
+                # tokens just before the boundary move into block k
+                first, last, step = max(boundary - moved, stop), min(boundary, count), -step
+            else:
+                # tokens just after the boundary move into block k - 1
+                first, last = max(boundary, stop), min(boundary - moved, count)
+            if first < last:
+                self._add(self.starts, first, last, step)
+                self._add(self.ends, first, last, step)
+
+    def replace(self, first, stop, kinds, starts, ends):
+        """Replace tokens [first, stop) with new ones; later tokens keep their offsets."""
+        moved = len(kinds) - (stop - first)
+        count = len(self.kinds)
+        if self.shifts is not None and moved:
+            if (count + moved) >> BLOCK_BITS >= len(self.shifts) or abs(moved) * len(self.breaks) > count:
+                # cheaper (or only possible) to apply the pending shifts first
+                self.flush()
+            else:
+                self._carry(stop, count, moved)
+        self.kinds[first:stop] = array('H', kinds)
+        if self.shifts is not None:
+            delta = self.shifts.delta
+            deltas = [delta(i >> BLOCK_BITS) for i in range(first, first + len(kinds))]
+            starts = [start - d for start, d in zip(starts, deltas)]
+            ends = [end - d for end, d in zip(ends, deltas)]
+        self.starts[first:stop] = array('i', starts)
+        self.ends[first:stop] = array('i', ends)
+
+    def find(self, offset):
+        """Index of the first token whose end is at or after `offset`."""
+        lo, hi = 0, len(self.kinds)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.end(mid) < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def nbytes(self):
+        """Memory used by the token columns, excluding the source buffer."""
+        return sum(col.itemsize * len(col) for col in (self.kinds, self.starts, self.ends))
@@ -1,6 +1,5 @@
 from lexer.lexer import Lexer
-from parser.grammar import Grammar
-from parser.ll1_table import LL1ParsingTable, LL1Helper
+from parser.compiled_grammar import load_compiled
 from parser.dpda_parser import DPDAParser
 from visualizer.tree_visualizer import ParseTreeVisualizer
 
@@ -17,16 +16,12 @@ def main():
     code = '\n'.join(lines)
 
     # بارگذاری گرامر
-    with open(grammar_file, 'r') as f:
-        grammar_text = f.read()
-
-    grammar = Grammar(grammar_text)
-    helper = LL1Helper(grammar)
-    table = LL1ParsingTable(grammar, helper.first, helper.follow)
-    parse_table = table.get_table()
+    compiled = load_compiled(grammar_file)
+    grammar = compiled.grammar
+    parse_table = compiled.parse_table
 
     # توکنایز کردن کد
-    lexer = Lexer()
+    lexer = compiled.lexer or Lexer()
     try:
         tokens = lexer.tokenize(code)
     except RuntimeError as e:
@@ -36,7 +31,7 @@ def main():
     print("Tokens:", tokens)
 
     # پارس کردن
-    parser = DPDAParser(grammar, parse_table)
+    parser = DPDAParser(grammar, parse_table, compiled.follow)
     tree = parser.parse_with_tree(tokens)
 
     if tree:
@@ -47,6 +42,9 @@ def main():
         visualizer.render(tree, "parse_tree")
     else:
         print("❌ Parse error.")
+        _, diagnostics = parser.parse_with_recovery(tokens)
+        for diagnostic in diagnostics:
+            print(f"  {diagnostic.message}")
 
         
 if __name__ == '__main__':
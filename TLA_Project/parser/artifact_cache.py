@@ -0,0 +1,96 @@
+"""
+On-disk cache of pickled build artifacts (compiled grammars).
+
+An artifact is stored under a key that hashes both its input (the spec
+text) and the source of the code that built it, so editing either one
+simply misses the cache. Unpickling runs code, so artifacts are only read
+from a directory that belongs to the current user and that nobody else can
+write to; the directory is created that way.
+"""
+import hashlib
+import os
+import pickle
+
+ARTIFACT_MAGIC = b'TLAC'
+ARTIFACT_VERSION = 3
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'tla_project')
+
+
+def source_digest(paths):
+    """SHA-256 over the content of the given source files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def cache_key(data, code_digest):
+    """Key for an artifact built from `data` (str or bytes) by code with source digest `code_digest`."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(bytes.fromhex(code_digest) + data).hexdigest()
+
+
+def private_dir(path):
+    """
+    Create `path` with user-only permissions if needed. Returns False when
+    an existing directory belongs to someone else and must not be used.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return True
+    info = os.stat(path)
+    if info.st_uid != os.getuid():
+        return False
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return True
+
+
+def _read_artifact(path, key):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(ARTIFACT_MAGIC) + 2 + 32)
+            if header != ARTIFACT_MAGIC + ARTIFACT_VERSION.to_bytes(2, 'little') + bytes.fromhex(key):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def _write_artifact(path, key, artifact):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+        f.write(ARTIFACT_MAGIC + ARTIFACT_VERSION.to_bytes(2, 'little') + bytes.fromhex(key))
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_cached(key, build, cache_dir=None):
+    """
+    Return the artifact cached under `key` (a hex digest from cache_key()),
+    or build() it and try to cache it. Without a usable cache directory the
+    artifact is just built.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    try:
+        usable = private_dir(cache_dir)
+    except OSError:
+        usable = False
+    if not usable:
+        return build()
+    path = os.path.join(cache_dir, f"{key}.v{ARTIFACT_VERSION}.tlac")
+    artifact = _read_artifact(path, key)
+    if artifact is None:
+        artifact = build()
+        try:
+            _write_artifact(path, key, artifact)
+        except OSError:
+            pass
+    return artifact
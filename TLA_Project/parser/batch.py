@@ -0,0 +1,173 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from lexer.lexer import Lexer, LexerError
+from lexer.positions import LineIndex
+from parser.compact_tree import CompactTree
+from parser.compiled_grammar import CompiledGrammar, load_compiled
+from parser.dpda_parser import ParseError
+
+MODES = ('tree', 'recognize')
+
+
+class ParseResult:
+    """
+    Outcome of parsing one source in parse_many().
+
+    `index` is the position of the source in the input. On success `ok` is
+    True and `tree` holds a CompactTree (None in 'recognize' mode). On
+    failure `error` holds the message, `error_index` the offending token
+    (None for lexer errors), `offset` the character offset and `line`/
+    `column` its 1-based position.
+    """
+
+    def __init__(self, index, ok, tree=None, error=None, error_index=None, offset=None, line=None, column=None):
+        self.index = index
+        self.ok = ok
+        self.tree = tree
+        self.error = error
+        self.error_index = error_index
+        self.offset = offset
+        self.line = line
+        self.column = column
+
+    def __repr__(self):
+        if self.ok:
+            return f"ParseResult({self.index}, ok)"
+        return f"ParseResult({self.index}, error={self.error!r})"
+
+
+class BatchParser:
+    """Lexes and parses sources with one CompiledGrammar; what each pool worker runs."""
+
+    def __init__(self, compiled: CompiledGrammar, mode='tree', paths=False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.compiled = compiled
+        self.lexer = compiled.lexer or Lexer()
+        self.parser = compiled.parser()
+        self.mode = mode
+        self.paths = paths
+
+    def parse_one(self, index, source):
+        if self.paths:
+            try:
+                with open(source, 'r', encoding='utf-8') as f:
+                    source = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                return self._error(index, f"Cannot read {source}: {e}", None, None, None)
+        try:
+            tokens = self.lexer.tokenize_columnar(source)
+        except LexerError as e:
+            return self._error(index, str(e), None, e.offset, source)
+        if self.mode == 'recognize':
+            ok, error_index = self.parser.recognize(tokens)
+            if ok:
+                return ParseResult(index, True)
+            kind = tokens.kind(error_index) if error_index < len(tokens) else '$'
+            error = ParseError(error_index, kind, tokens.value(error_index) if kind != '$' else None)
+        else:
+            try:
+                tree = CompactTree.from_events(self.compiled.grammar.symbols,
+                                               self.parser.event_batches(tokens), tokens, batched=True)
+                return ParseResult(index, True, tree=tree)
+            except ParseError as e:
+                error = e
+        if error.index < len(tokens):
+            offset = tokens.start(error.index)
+        else:
+            offset = len(source)
+        return self._error(index, str(error), error.index, offset, source)
+
+    @staticmethod
+    def _error(index, message, error_index, offset, source):
+        line, column = LineIndex(source).line_col(offset) if offset is not None else (None, None)
+        return ParseResult(index, False, error=message, error_index=error_index,
+                           offset=offset, line=line, column=column)
+
+    def parse_chunk(self, chunk):
+        return [self.parse_one(index, source) for index, source in chunk]
+
+
+_worker = None
+
+
+def _init_worker(compiled, mode, paths):
+    global _worker
+    _worker = BatchParser(compiled, mode, paths)
+
+
+def _parse_chunk(chunk):
+    return _worker.parse_chunk(chunk)
+
+
+def _chunks(sources, chunk_size):
+    numbered = enumerate(sources)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_many(sources, spec, workers=None, mode='tree', ordered=True, chunk_size=32, paths=False):
+    """
+    Parse many sources with one grammar, yielding a ParseResult per source.
+
+    `spec` is a spec or grammar file path (compiled through the artifact
+    cache) or a CompiledGrammar. It is compiled once in the calling process
+    and handed to each worker once, by the pool initializer. Sources are
+    sent in chunks of `chunk_size` to cut down on IPC, and at most a few
+    chunks per worker are in flight, so `sources` can be a lazy iterable.
+    With paths=True the items of `sources` are file paths that the workers
+    read themselves.
+
+    Results come back in input order with ordered=True, otherwise as soon as
+    their chunk completes (ParseResult.index tells them apart). mode='tree'
+    returns a CompactTree per source; mode='recognize' only the verdict.
+    workers=0 parses in the calling process. A source file that cannot be
+    read gives a failed ParseResult without an offset.
+
+    A bad `mode` or `spec` raises here, not at the first next().
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    compiled = spec if isinstance(spec, CompiledGrammar) else load_compiled(spec)
+    return _parse_many(sources, compiled, workers, mode, ordered, chunk_size, paths)
+
+
+def _parse_many(sources, compiled, workers, mode, ordered, chunk_size, paths):
+    chunks = _chunks(sources, chunk_size)
+    if workers == 0:
+        worker = BatchParser(compiled, mode, paths)
+        for chunk in chunks:
+            yield from worker.parse_chunk(chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(compiled, mode, paths)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) < window:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
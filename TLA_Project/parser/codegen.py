@@ -0,0 +1,217 @@
+import re
+
+from parser.grammar import Grammar
+from parser.ll1_table import LL1ParsingTable
+
+HEADER = '''"""
+Recursive-descent parser generated from an LL(1) grammar by parser/codegen.py.
+Do not edit; regenerate it from the grammar instead.
+
+parse(tokens) returns the same ParseTreeNode tree as
+DPDAParser.parse_with_tree, or None on a syntax error.
+"""
+{node_import}
+
+END = ('$', None)
+KIND_IDS = {kind_ids!r}
+UNKNOWN = {unknown}
+
+
+class _Reject(Exception):
+    pass
+
+
+class _Cursor:
+    """
+    The token list, its kind IDs and the span columns, shared by the parse_*
+    functions of one parse() call. Those thread only the token index through
+    their arguments and return values.
+    """
+    __slots__ = ('tokens', 'ids', 'spans', 'start', 'count', 'last_end')
+
+    def __init__(self, tokens):
+        self.spans = getattr(tokens, 'span', None)
+        self.start = getattr(tokens, 'start', None)
+        self.tokens = list(tokens)
+        self.count = len(self.tokens)
+        self.tokens.append(END)
+        self.ids = [KIND_IDS.get(kind, UNKNOWN) for kind, _ in self.tokens]
+        self.last_end = 0
+'''
+
+FOOTER = '''
+
+def parse(tokens):
+    cur = _Cursor(tokens)
+    holder = ParseTreeNode(None)
+    try:
+        if cur.ids[{start}(cur, holder, 0)] != 0:
+            return None
+    except _Reject:
+        return None
+    return holder.children[0]
+'''
+
+
+class CodeWriter:
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+
+    def line(self, text=''):
+        self.lines.append('    ' * self.level + text if text else '')
+
+    def indent(self):
+        self.level += 1
+
+    def dedent(self):
+        self.level -= 1
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class RecursiveDescentGenerator:
+    """
+    Turns a Grammar and its LL1ParsingTable into the source of a standalone
+    module with one module-level function per non-terminal. Each function switches
+    on the integer ID of the lookahead kind with constant-set membership
+    tests taken from the table row, so parsing never touches the grammar or
+    the table. parse() converts the kinds to IDs once up front; the functions
+    then share them through a per-call _Cursor and pass only the token index
+    between each other, so nothing is re-created per call and no state lives
+    in closure cells.
+
+    A body that ends with its own head (the right-recursive lists that LL(1)
+    grammars use instead of left recursion) becomes a loop rather than a
+    call, so long statement or operator lists do not grow the Python stack.
+    Other nesting still recurses, one frame per non-terminal.
+    """
+
+    def __init__(self, grammar: Grammar, table: LL1ParsingTable,
+                 node_import='from parser.dpda_parser import ParseTreeNode'):
+        self.grammar = grammar
+        self.dense = table.get_dense_table()
+        self.node_import = node_import
+        self.function_names = {}
+        for nt in range(grammar.terminal_count, len(grammar.symbols)):
+            name = re.sub(r'\W', '_', grammar.symbols[nt])
+            self.function_names[nt] = f"parse_{nt}_{name}"
+
+    def predict_sets(self, nt):
+        """[(production, sorted terminal IDs)], largest set first."""
+        dense = self.dense
+        by_production = {}
+        for t in range(dense.terminal_count):
+            production = dense.lookup(nt, t)
+            if production != dense.ERROR:
+                by_production.setdefault(production, []).append(t)
+        return sorted(by_production.items(), key=lambda item: (-len(item[1]), item[0]))
+
+    def generate(self):
+        g = self.grammar
+        out = CodeWriter()
+        kind_ids = {sym: i for i, sym in enumerate(g.symbols[:g.terminal_count])}
+        out.lines.extend(HEADER.format(node_import=self.node_import, kind_ids=kind_ids,
+                                       unknown=g.terminal_count).splitlines())
+        for nt in self.function_names:
+            out.line()
+            out.line()
+            self._function(out, nt)
+        out.lines.extend(FOOTER.format(start=self.function_names[g.symbol_ids[g.start_symbol]]).splitlines())
+        return out.text()
+
+    def _function(self, out, nt):
+        g = self.grammar
+        predictions = self.predict_sets(nt)
+        tail = any(g.production_bodies[p][-1:] == (nt,) for p, _ in predictions)
+        out.line(f"def {self.function_names[nt]}(cur, parent, index):")
+        out.indent()
+        out.line(f"# {g.symbols[nt]}")
+        if any(sym < g.terminal_count for p, _ in predictions for sym in g.production_bodies[p]):
+            out.line("tokens, ids, spans = cur.tokens, cur.ids, cur.spans")
+        else:
+            out.line("ids, spans = cur.ids, cur.spans")
+        if tail:
+            out.line("outer = parent")
+            out.line("while True:")
+            out.indent()
+        out.line(f"node = ParseTreeNode({g.symbols[nt]!r})")
+        out.line("parent.children.append(node)")
+        out.line("if spans:")
+        out.line("    node.start = cur.start(index) if index < cur.count else cur.last_end")
+        out.line("k = ids[index]")
+        keyword = 'if'
+        for production, terminals in predictions:
+            test = f"k == {terminals[0]}" if len(terminals) == 1 else f"k in {{{', '.join(map(str, terminals))}}}"
+            out.line(f"{keyword} {test}:")
+            out.indent()
+            out.line(f"# {self.grammar.production_string(production)}")
+            body = g.production_bodies[production]
+            loops = tail and body[-1:] == (nt,)
+            for i, sym in enumerate(body[:-1] if loops else body):
+                # a body starting with a terminal is only predicted on that terminal
+                self._symbol(out, sym, checked=i == 0)
+            if loops:
+                out.line("parent = node")
+                out.line("continue")
+            elif not body:
+                out.line("pass")
+            out.dedent()
+            keyword = 'elif'
+        if predictions:
+            out.line("else:")
+            out.line("    raise _Reject")
+        else:
+            out.line("raise _Reject")
+        if tail:
+            out.line("break")
+            out.dedent()
+            out.line("if spans:")
+            out.line("    # the chain of looped nodes hangs off each other's last child")
+            out.line("    node = outer.children[-1]")
+            out.line("    while True:")
+            out.line("        node.end = max(cur.last_end, node.start)")
+            out.line(f"        if not node.children or node.children[-1].symbol != {g.symbols[nt]!r}:")
+            out.line("            break")
+            out.line("        node = node.children[-1]")
+        else:
+            out.line("if spans:")
+            out.line("    node.end = max(cur.last_end, node.start)")
+        out.line("return index")
+        out.dedent()
+
+    def _symbol(self, out, sym, checked=False):
+        if sym >= self.grammar.terminal_count:
+            out.line(f"index = {self.function_names[sym]}(cur, node, index)")
+            return
+        if not checked:
+            out.line(f"if ids[index] != {sym}:")
+            out.line("    raise _Reject")
+        out.line("kind, value = tokens[index]")
+        out.line("leaf = ParseTreeNode(kind, value)")
+        out.line("node.children.append(leaf)")
+        out.line("if spans and index < cur.count:")
+        out.line("    leaf.start, leaf.end = spans(index)")
+        out.line("    cur.last_end = leaf.end")
+        out.line("index += 1")
+
+
+def generate_parser_source(grammar: Grammar, table: LL1ParsingTable, **options):
+    """Source text of a recursive-descent parser module for `grammar`."""
+    return RecursiveDescentGenerator(grammar, table, **options).generate()
+
+
+def write_parser_module(grammar: Grammar, table: LL1ParsingTable, path, **options):
+    source = generate_parser_source(grammar, table, **options)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    return path
+
+
+def compile_parser(grammar: Grammar, table: LL1ParsingTable, name='generated_parser', **options):
+    """Generate the parser module in memory and return its parse() function."""
+    source = generate_parser_source(grammar, table, **options)
+    namespace = {'__name__': name}
+    exec(compile(source, f"<{name}>", 'exec'), namespace)
+    return namespace['parse']
@@ -0,0 +1,294 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from parser.dpda_parser import ENTER, EXIT, TOKEN, ParseError
+
+NO_NODE = -1
+
+
+class CompactTree:
+    """
+    A parse tree stored as parallel arrays indexed by node number. Nodes are
+    numbered in pre-order, so walking the arrays front to back visits the
+    tree depth-first and a subtree occupies one contiguous range.
+
+        symbol[n]        symbol ID (Grammar.symbols)
+        parent[n]        parent node, NO_NODE for the root
+        first_child[n]   first child, NO_NODE for leaves and empty subtrees
+        next_sibling[n]  next sibling, NO_NODE for the last child
+        token[n]         token index for leaves, NO_NODE otherwise
+
+    Tokens skipped by a recovering parse are not nodes. Each run of them is
+    recorded in skipped_at (the number of nodes created before it, so it
+    lies inside node skipped_at - 1), skipped_start and skipped_stop (its
+    token index range); they only matter for offsets and token values.
+
+    Token values are not copied when the tree is built from a token list or
+    TokenStream: they are read back from it by token index. A node costs 18
+    bytes instead of a ParseTreeNode object with its own __dict__ and
+    children list. Use node(n) or root for a ParseTreeNode-like view.
+    """
+
+    def __init__(self, symbols, tokens=None):
+        self.symbols = symbols
+        self.symbol_ids = {sym: i for i, sym in enumerate(symbols)}
+        self.tokens = tokens
+        self.symbol = array('H')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.token = array('i')
+        self.skipped_at = array('i')
+        self.skipped_start = array('i')
+        self.skipped_stop = array('i')
+        self.consumed = 0
+        self.values = None
+        self.leaf_nodes = None
+
+    @classmethod
+    def from_events(cls, symbols, events, tokens=None, batched=False):
+        """Build from DPDAParser.events() (or event_batches() with batched=True)."""
+        tree = cls(symbols, tokens)
+        symbol_ids = tree.symbol_ids
+        symbol = tree.symbol
+        parent = tree.parent
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        token = tree.token
+        if not batched:
+            events = [events]
+        if not hasattr(tokens, '__getitem__'):
+            # a one-shot iterator: keep only the values (the kinds are in `symbol`)
+            tree.values = []
+            add_value = tree.values.append
+        else:
+            add_value = None
+
+        open_nodes = []  # (parent, node) for every node entered but not exited
+        current = NO_NODE
+        last = NO_NODE
+        index = 0
+        count = 0
+        for batch in events:
+            for event in batch:
+                tag = event[0]
+                if tag == ENTER or tag == TOKEN:
+                    node = count
+                    count += 1
+                    symbol.append(symbol_ids[event[1]])
+                    parent.append(current)
+                    first_child.append(NO_NODE)
+                    next_sibling.append(NO_NODE)
+                    if last != NO_NODE:
+                        next_sibling[last] = node
+                    elif current != NO_NODE:
+                        first_child[current] = node
+                    if tag == TOKEN:
+                        token.append(index)
+                        index += 1
+                        if add_value:
+                            add_value(event[2])
+                        last = node
+                    else:
+                        token.append(NO_NODE)
+                        open_nodes.append((current, node))
+                        current = node
+                        last = NO_NODE
+                elif tag == EXIT:
+                    last = current
+                    current = open_nodes.pop()[0]
+                else:
+                    # ERROR events of a recovering parse: skipped tokens are not nodes
+                    skipped = event[1].skipped
+                    if skipped:
+                        tree.skipped_at.append(count)
+                        tree.skipped_start.append(index)
+                        index += len(skipped)
+                        tree.skipped_stop.append(index)
+                        if add_value:
+                            for _, value in skipped:
+                                add_value(value)
+        tree.consumed = index
+        return tree
+
+    @classmethod
+    def parse(cls, parser, tokens):
+        """Parse `tokens` with a DPDAParser into a CompactTree, or None on a syntax error."""
+        try:
+            return cls.from_events(parser.grammar.symbols, parser.event_batches(tokens), tokens, batched=True)
+        except ParseError:
+            return None
+
+    def __len__(self):
+        return len(self.symbol)
+
+    @property
+    def root(self):
+        return CompactNode(self, 0) if len(self.symbol) else None
+
+    def node(self, n):
+        return CompactNode(self, n)
+
+    def children_of(self, n):
+        child = self.first_child[n]
+        next_sibling = self.next_sibling
+        while child != NO_NODE:
+            yield child
+            child = next_sibling[child]
+
+    def value_of(self, n):
+        t = self.token[n]
+        if t == NO_NODE:
+            return None
+        if self.values is not None:
+            return self.values[t]
+        if hasattr(self.tokens, 'value'):
+            return self.tokens.value(t)
+        return self.tokens[t][1]
+
+    def subtree_stop(self, n):
+        """One past the last node of the subtree at n (subtrees are pre-order ranges)."""
+        while n != NO_NODE and self.next_sibling[n] == NO_NODE:
+            n = self.parent[n]
+        return self.next_sibling[n] if n != NO_NODE else len(self.symbol)
+
+    def _leaf_nodes(self):
+        leaves = self.leaf_nodes
+        if leaves is None:
+            leaves = self.leaf_nodes = array('i', (n for n, t in enumerate(self.token) if t != NO_NODE))
+        return leaves
+
+    def _next_token(self, n):
+        """Index of the first token (leaf or skipped) read after node n was entered."""
+        leaves = self._leaf_nodes()
+        i = bisect_left(leaves, n)
+        t = self.token[leaves[i]] if i < len(leaves) else self.consumed
+        j = bisect_right(self.skipped_at, n)
+        if j < len(self.skipped_at):
+            t = min(t, self.skipped_start[j])
+        return t
+
+    def _last_token(self, n):
+        """Index of the last token (leaf or skipped) read before node n was exited, or -1."""
+        stop = self.subtree_stop(n)
+        i = bisect_left(self._leaf_nodes(), stop) - 1
+        t = self.token[self.leaf_nodes[i]] if i >= 0 else -1
+        j = bisect_right(self.skipped_at, stop) - 1
+        if j >= 0:
+            t = max(t, self.skipped_stop[j] - 1)
+        return t
+
+    def start_of(self, n):
+        """
+        Offset where node n starts, as ParseTreeNode.start would be: the start
+        of the first token at or after it, or the end of the input. None when
+        the tokens carry no offsets.
+        """
+        tokens = self.tokens
+        if not hasattr(tokens, 'span'):
+            return None
+        t = self._next_token(n)
+        if t < len(tokens):
+            return tokens.start(t)
+        return tokens.end(len(tokens) - 1) if len(tokens) else 0
+
+    def end_of(self, n):
+        """Offset where node n ends: the end of its last token (start_of(n) if it has none)."""
+        start = self.start_of(n)
+        if start is None:
+            return None
+        t = self._last_token(n)
+        return max(self.tokens.end(t) if t >= 0 else 0, start)
+
+    def depth_first(self, n=0):
+        """(node, depth) pairs of the subtree at n in pre-order, without recursion."""
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        stack = [(n, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            child = first_child[node]
+            children = []
+            while child != NO_NODE:
+                children.append((child, depth + 1))
+                child = next_sibling[child]
+            stack.extend(reversed(children))
+
+    def nbytes(self):
+        """Memory used by the node columns (token values and the source excluded)."""
+        columns = (self.symbol, self.parent, self.first_child, self.next_sibling, self.token)
+        return sum(col.itemsize * len(col) for col in columns)
+
+
+class CompactNode:
+    """Read-only view of one CompactTree node with the ParseTreeNode interface."""
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self):
+        return f"CompactNode({self.symbol!r}, {self.value!r})"
+
+    @property
+    def symbol(self):
+        return self.tree.symbols[self.tree.symbol[self.index]]
+
+    @property
+    def value(self):
+        return self.tree.value_of(self.index)
+
+    @property
+    def children(self):
+        tree = self.tree
+        return [CompactNode(tree, child) for child in tree.children_of(self.index)]
+
+    @property
+    def parent(self):
+        parent = self.tree.parent[self.index]
+        return CompactNode(self.tree, parent) if parent != NO_NODE else None
+
+    @property
+    def start(self):
+        return self.tree.start_of(self.index)
+
+    @property
+    def end(self):
+        return self.tree.end_of(self.index)
+
+    def location(self, line_index):
+        """(line, column) of the node's first character, or None without spans."""
+        start = self.start
+        if start is None:
+            return None
+        return line_index.line_col(start)
+
+    def display(self, level=0, line_index=None, file=None):
+        """Print the tree, one indented line per node, to `file` (default stdout)."""
+        write = (file if file is not None else sys.stdout).write
+        tree = self.tree
+        lines = []
+        for node, depth in tree.depth_first(self.index):
+            view = CompactNode(tree, node)
+            value = tree.value_of(node)
+            where = ""
+            if line_index is not None:
+                location = view.location(line_index)
+                if location is not None:
+                    where = f" @{location[0]}:{location[1]}"
+            lines.append('  ' * (level + depth) + f"{view.symbol}" + (f": {value}" if value else "") + where)
+            if len(lines) >= 1024:
+                write('\n'.join(lines) + '\n')
+                lines = []
+        if lines:
+            write('\n'.join(lines) + '\n')
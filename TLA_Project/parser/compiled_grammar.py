@@ -0,0 +1,69 @@
+import os
+
+from lexer.dfa_lexer import DFALexer
+from parser.artifact_cache import cache_key, load_cached, source_digest
+from parser.dpda_parser import DPDAParser
+from parser.first_follow import GraphLL1Helper
+from parser.grammar import Grammar
+from parser.ll1_table import LL1ParsingTable
+
+GRAMMAR_HEADER = '# === GRAMMAR ==='
+LEXER_HEADER = '# === LEXER ==='
+
+
+def split_spec(text):
+    """
+    Split spec text into (grammar_text, lexer_text). Plain grammar files
+    without a LEXER section give lexer_text == None.
+    """
+    lexer_start = text.find(LEXER_HEADER)
+    if lexer_start == -1:
+        return text, None
+    grammar_text = text[:lexer_start].replace(GRAMMAR_HEADER, '')
+    grammar_lines = [line for line in grammar_text.splitlines() if not line.strip().startswith('#')]
+    return '\n'.join(grammar_lines), text[lexer_start + len(LEXER_HEADER):]
+
+
+class CompiledGrammar:
+    """Everything derived from one spec: grammar, FIRST/FOLLOW, LL(1) table and lexer."""
+
+    def __init__(self, spec_text):
+        grammar_text, lexer_text = split_spec(spec_text)
+        self.grammar = Grammar(grammar_text)
+        helper = GraphLL1Helper(self.grammar)
+        self.first = helper.first
+        self.follow = helper.follow
+        self.table = LL1ParsingTable(self.grammar, self.first, self.follow)
+        self.parse_table = self.table.get_table()
+        self.dense_table = self.table.get_dense_table()
+        self.lexer = DFALexer.from_lexer_text(lexer_text) if lexer_text is not None else None
+
+    def parser(self):
+        return DPDAParser(self.grammar, self.dense_table, self.follow)
+
+
+_code_digest = None
+
+
+def code_digest():
+    """Source digest of the lexer and parser packages, whose classes a CompiledGrammar pickles."""
+    global _code_digest
+    if _code_digest is None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        paths = []
+        for package in ('lexer', 'parser'):
+            directory = os.path.join(root, package)
+            paths += [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.py')]
+        _code_digest = source_digest(paths)
+    return _code_digest
+
+
+def load_compiled(spec_path, cache_dir=None):
+    """
+    Return the CompiledGrammar for a spec or grammar file, loading it from the
+    artifact cache (parser/artifact_cache.py) when neither the file nor the
+    lexer/parser code has changed since it was built.
+    """
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        spec_text = f.read()
+    return load_cached(cache_key(spec_text, code_digest()), lambda: CompiledGrammar(spec_text), cache_dir)
@@ -1,51 +1,575 @@
+import sys
+
+from parser.first_follow import GraphLL1Helper
+from parser.ll1_table import DenseParseTable
+from parser.traversal import depth_first
+
+
 class ParseTreeNode:
-    def __init__(self, symbol, value=None):
+    def __init__(self, symbol, value=None, start=None, end=None):
         self.symbol = symbol
         self.value = value
         self.children = []
+        self.start = start
+        self.end = end
+
+    def location(self, line_index):
+        """(line, column) of the node's first character, or None without spans."""
+        if self.start is None:
+            return None
+        return line_index.line_col(self.start)
 
-    def display(self, level=0):
-        print('  ' * level + f"{self.symbol}" + (f": {self.value}" if self.value else ""))
-        for child in self.children:
-            child.display(level + 1)
+    def display(self, level=0, line_index=None, file=None):
+        """Print the tree, one indented line per node, to `file` (default stdout)."""
+        write = (file if file is not None else sys.stdout).write
+        lines = []
+        for node, depth in depth_first(self):
+            where = ""
+            if line_index is not None and node.start is not None:
+                line, col = node.location(line_index)
+                where = f" @{line}:{col}"
+            lines.append('  ' * (level + depth) + f"{node.symbol}" + (f": {node.value}" if node.value else "") + where)
+            if len(lines) >= 1024:
+                write('\n'.join(lines) + '\n')
+                lines = []
+        if lines:
+            write('\n'.join(lines) + '\n')
 
 class DPDAParser:
-    def __init__(self, grammar, parse_table):
+    def __init__(self, grammar, parse_table, follow=None):
         self.grammar = grammar
         self.parse_table = parse_table
+        if isinstance(parse_table, DenseParseTable):
+            self.dense = parse_table
+        else:
+            self.dense = DenseParseTable.from_parse_table(grammar, parse_table)
+        self.terminal_ids = {sym: i for i, sym in enumerate(grammar.symbols[:grammar.terminal_count])}
+        self.follow = follow
+        self._recovery_tables = None
+
+    def recovery_tables(self):
+        """
+        (sync, epsilon) lists indexed by symbol ID for error recovery.
+        sync[A] is A's synchronization set as a terminal bitset: FOLLOW(A)
+        plus '$'. FOLLOW comes from the sets given to the constructor (as
+        computed by LL1Helper), or is computed here. epsilon[A] is the number
+        of an `A -> eps` production, or -1.
+        """
+        if self._recovery_tables is None:
+            grammar = self.grammar
+            follow = self.follow if self.follow is not None else GraphLL1Helper(grammar).follow
+            sync = [0] * len(grammar.symbols)
+            for nt in grammar.non_terminals:
+                bits = 1
+                for terminal in follow.get(nt, ()):
+                    bits |= 1 << self.terminal_ids[terminal]
+                sync[grammar.symbol_ids[nt]] = bits
+            epsilon = [-1] * len(grammar.symbols)
+            for number, (head, body) in enumerate(zip(grammar.production_heads, grammar.production_bodies)):
+                if not body and epsilon[head] < 0:
+                    epsilon[head] = number
+            self._recovery_tables = sync, epsilon
+        return self._recovery_tables
+
+    def expected(self, nt_id):
+        """Names of the terminals that have a table entry for non-terminal `nt_id`."""
+        symbols = self.grammar.symbols
+        return [symbols[t] for t in range(self.grammar.terminal_count)
+                if self.dense.lookup(nt_id, t) != DenseParseTable.ERROR]
+
+    def _accepted_below(self, stack, current):
+        """Whether a symbol still on a parse stack (exit markers aside) can take terminal `current`."""
+        terminal_count = self.grammar.terminal_count
+        cells = self.dense.cells
+        width = self.dense.width
+        base = self.dense.base
+        for symbol in reversed(stack):
+            if symbol < 0:
+                continue
+            if symbol < terminal_count:
+                if symbol == current:
+                    return True
+            elif cells[symbol * width + current - base] >= 0:
+                return True
+        return False
+
+    def terminal_stream(self, tokens):
+        """
+        Terminal IDs of `tokens` followed by 0 ('$'). Kinds the grammar does
+        not know map to terminal_count. A TokenStream's kind column is
+        translated directly, without slicing token values out of the source.
+        """
+        unknown = self.grammar.terminal_count
+        terminal_ids = self.terminal_ids
+        kind_names = getattr(tokens, 'kind_names', None)
+        if kind_names is not None:
+            translate = [terminal_ids.get(name, unknown) for name in kind_names]
+            yield from map(translate.__getitem__, tokens.kinds)
+        else:
+            for kind, _ in tokens:
+                yield terminal_ids.get(kind, unknown)
+        yield 0
 
-    def parse_with_tree(self, tokens):
-        stack = [('$', None)]
-        stack.append((self.grammar.start_symbol, None))
-        input_tokens = tokens + [('$', None)]
+    def recognize(self, tokens):
+        """
+        Run the DPDA without building a tree. Returns (True, None) when the
+        tokens are accepted and (False, index) otherwise, where index is the
+        position of the offending token (len(tokens) for an unexpected end of
+        input). Only the stack of symbol IDs is kept, so memory grows with
+        the stack depth rather than with the input.
+        """
+        grammar = self.grammar
+        push_sequences = grammar.push_sequences
+        terminal_count = grammar.terminal_count
+        cells = self.dense.cells
+        width = self.dense.width
+        base = self.dense.base
+
+        stack = [0, grammar.symbol_ids[grammar.start_symbol]]
+        pop = stack.pop
+        extend = stack.extend
+        terminals = self.terminal_stream(tokens)
+        current = next(terminals)
         index = 0
-        root = None
+        while stack:
+            top = pop()
+            if top < terminal_count:
+                if top != current:
+                    return False, index
+                index += 1
+                current = next(terminals, 0)
+                continue
+            production = cells[top * width + current - base]
+            if production < 0:
+                return False, index
+            extend(push_sequences[production])
+        return True, None
+
+    def events(self, tokens):
+        """
+        Parse `tokens` lazily, yielding a flat event stream:
+
+            (ENTER, non_terminal, production)  production number, see Grammar.production_string
+            (TOKEN, kind, value)
+            (EXIT, non_terminal)
+
+        Events for a non-terminal are bracketed by its ENTER and EXIT in
+        pre-order, so the stream describes the same tree parse_with_tree
+        builds. Only the parser stack and a small batch of pending events are
+        kept, so memory grows with nesting depth, not input size. A syntax
+        error raises ParseError after the events for the valid prefix.
+        """
+        for batch in self.event_batches(tokens):
+            yield from batch
+
+    def event_batches(self, tokens, batch_size=256, recover=False, start=None):
+        """
+        events(tokens) delivered as lists of about `batch_size` events.
+
+        With a non-terminal ID as `start`, only one subtree for that symbol is
+        parsed from the beginning of `tokens`: events stop as soon as it is
+        complete and the tokens after it are not checked (the first of them
+        is still used as lookahead).
+
+        With recover=True a syntax error does not stop the parse. It emits
+        (ERROR, SyntaxDiagnostic) and recovers in panic mode: a terminal on
+        top of the stack that does not match is treated as missing and
+        popped. A non-terminal A without a table entry that has an `A -> eps`
+        production silently takes it when a symbol further down the stack
+        can use the token, so the error is reported there, with a narrower
+        expected set. Otherwise input tokens are skipped until one can be
+        expanded from A or is in A's synchronization set (FOLLOW(A) and
+        '$'), so an extra token inside a statement resumes at the next
+        statement instead of unwinding the enclosing lists. If no token
+        could be expanded, A is given up and emitted as (ENTER, A, -1),
+        ERROR, (EXIT, A). Tokens left over after the start symbol is
+        complete are reported from the first of them and skipped. Skipped
+        tokens are carried by the diagnostic, not by TOKEN events. Further
+        errors at the same token without skipping any input are cascades of
+        the first one and are recovered from without another diagnostic.
+        """
+        grammar = self.grammar
+        symbols = grammar.symbols
+        push_sequences = grammar.push_sequences
+        terminal_count = grammar.terminal_count
+        terminal_ids = self.terminal_ids
+        unknown = terminal_count
+        cells = self.dense.cells
+        width = self.dense.width
+        base = self.dense.base
+
+        # an exit marker for non-terminal X is stored as ~X (always negative)
+        if start is None:
+            stack = [0, grammar.symbol_ids[grammar.start_symbol]]
+        else:
+            stack = [start]
+        pop = stack.pop
+        append = stack.append
+        extend = stack.extend
+        input_tokens = iter(tokens)
+        current_token, current_value = next(input_tokens, ('$', None))
+        current = terminal_ids.get(current_token, unknown)
+        index = 0
+        batch = []
+        emit = batch.append
+        # ENTER/EXIT events never change, so share one tuple per production/symbol
+        enter_events = [(ENTER, symbols[head], number) for number, head in enumerate(grammar.production_heads)]
+        exit_events = [(EXIT, sym) for sym in symbols]
+        sync, epsilon = self.recovery_tables() if recover else (None, None)
+        last_error = -1
 
         while stack:
-            top_symbol, parent_node = stack.pop()
-            current_token, current_value = input_tokens[index]
-            if top_symbol == current_token:
+            top = pop()
+            if top < 0:
+                emit(exit_events[~top])
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+                    emit = batch.append
+                continue
+            if top < terminal_count:
+                if top != current:
+                    if not recover:
+                        if batch:
+                            yield batch
+                        raise ParseError(index, current_token, current_value)
+                    diagnostic = SyntaxDiagnostic(index, current_token, current_value, [symbols[top]], [], tokens)
+                    if top == 0:
+                        # input left over after a complete parse: nothing on
+                        # the stack can take it, so skip all of it
+                        while current != 0:
+                            diagnostic.skipped.append((current_token, current_value))
+                            index += 1
+                            current_token, current_value = next(input_tokens, ('$', None))
+                            current = terminal_ids.get(current_token, unknown)
+                    if diagnostic.skipped or diagnostic.index != last_error:
+                        emit((ERROR, diagnostic))
+                        last_error = diagnostic.index
+                    continue
+                if top:
+                    emit((TOKEN, current_token, current_value))
                 index += 1
-                leaf = ParseTreeNode(current_token, current_value)
-                if parent_node:
-                    parent_node.children.append(leaf)
+                current_token, current_value = next(input_tokens, ('$', None))
+                current = terminal_ids.get(current_token, unknown)
+                continue
+            production = cells[top * width + current - base]
+            if production < 0 and recover and epsilon[top] >= 0 and self._accepted_below(stack, current):
+                production = epsilon[top]
+            if production < 0:
+                if not recover:
+                    if batch:
+                        yield batch
+                    raise ParseError(index, current_token, current_value)
+                diagnostic = SyntaxDiagnostic(index, current_token, current_value,
+                                              self.expected(top), [], tokens)
+                sync_bits = sync[top]
+                while production < 0 and current != 0 and not (sync_bits >> current) & 1:
+                    diagnostic.skipped.append((current_token, current_value))
+                    index += 1
+                    current_token, current_value = next(input_tokens, ('$', None))
+                    current = terminal_ids.get(current_token, unknown)
+                    production = cells[top * width + current - base]
+                report = diagnostic.skipped or diagnostic.index != last_error
+                last_error = diagnostic.index
+                if production < 0:
+                    emit((ENTER, symbols[top], -1))
+                    if report:
+                        emit((ERROR, diagnostic))
+                    emit(exit_events[top])
+                    continue
+                emit(enter_events[production])
+                if report:
+                    emit((ERROR, diagnostic))
+                append(~top)
+                extend(push_sequences[production])
                 continue
-            elif top_symbol in self.grammar.terminals:
-                return None
-            key = (top_symbol, current_token)
-            if key not in self.parse_table:
-                return None
-            rule = self.parse_table[key]
-            _, rhs = rule.split('->')
-            rhs_symbols = rhs.strip().split()
-            node = ParseTreeNode(top_symbol)
-            if parent_node:
-                parent_node.children.append(node)
+            emit(enter_events[production])
+            append(~top)
+            extend(push_sequences[production])
+        if batch:
+            yield batch
+
+    def parse_units(self, tokens, units=None, policy=None):
+        """
+        Parse `tokens` and yield the subtree of each top-level unit as soon as
+        it is complete, without building the rest of the tree. `units` names
+        the non-terminals to hand off (by default those in the start symbol's
+        productions, e.g. every Function of a Program). Everything outside
+        them (Program -> Function Program) is only recognized: its nodes and
+        tokens are not kept, and right-recursive lists are walked without
+        growing the stack. `tokens` may be a lazy iterator such as
+        Lexer.tokenize_stream(), so memory is bounded by the largest unit
+        rather than by the input. With a TokenStream, the subtrees get
+        start/end offsets. `policy` is a TreePolicy for the subtrees.
+
+        Raises ParseError (with the position in `tokens`) on a syntax error,
+        after yielding the units before it.
+        """
+        grammar = self.grammar
+        terminal_count = grammar.terminal_count
+        start = grammar.symbol_ids[grammar.start_symbol]
+        if units is None:
+            unit_ids = {sym for head, body in zip(grammar.production_heads, grammar.production_bodies)
+                        if head == start for sym in body if sym >= terminal_count and sym != start}
+        else:
+            unit_ids = {grammar.symbol_ids[name] for name in units}
+        span_tokens = tokens if hasattr(tokens, 'span') else None
+        cursor = _TokenCursor(tokens)
+        cells = self.dense.cells
+        width = self.dense.width
+        base = self.dense.base
+        terminal_ids = self.terminal_ids
+        unknown = terminal_count
+
+        stack = [0, start]
+        while stack:
+            top = stack.pop()
+            kind, value = cursor.peek()
+            current = terminal_ids.get(kind, unknown)
+            if top >= terminal_count and top in unit_ids:
+                first = cursor.index
+                try:
+                    subtree = build_tree(self.event_batches(cursor, start=top), span_tokens,
+                                         batched=True, first_index=first, policy=policy)
+                except ParseError as e:
+                    raise ParseError(first + e.index, e.kind, e.value) from None
+                # the subtree's parse read one token of lookahead past its end
+                cursor.unread()
+                yield subtree
+            elif top < terminal_count:
+                if top != current:
+                    raise ParseError(cursor.index, kind, value)
+                if top:
+                    next(cursor)
+            else:
+                production = cells[top * width + current - base]
+                if production < 0:
+                    raise ParseError(cursor.index, kind, value)
+                stack.extend(grammar.push_sequences[production])
+
+    def parse_with_handler(self, tokens, handler):
+        """
+        Drive `handler.enter(non_terminal, production)`,
+        `handler.token(kind, value)` and `handler.exit(non_terminal)` from
+        events(tokens). Raises ParseError on a syntax error.
+        """
+        enter = handler.enter
+        token = handler.token
+        exit_ = handler.exit
+        for event in self.events(tokens):
+            tag = event[0]
+            if tag == ENTER:
+                enter(event[1], event[2])
+            elif tag == TOKEN:
+                token(event[1], event[2])
+            else:
+                exit_(event[1])
+
+    def parse_with_recovery(self, tokens, policy=None):
+        """
+        Parse all of `tokens` in one pass, recovering from syntax errors (see
+        event_batches). Returns (tree, diagnostics): the tree always has a
+        root, with an ERROR node (holding any skipped tokens) at every place
+        where recovery happened; diagnostics lists a SyntaxDiagnostic per
+        error in input order. `policy` is a TreePolicy for build_tree().
+        """
+        diagnostics = []
+        root = build_tree(self.event_batches(tokens, recover=True), tokens, batched=True, errors=diagnostics,
+                          policy=policy)
+        return root, diagnostics
+
+    def parse_with_tree(self, tokens, policy=None):
+        """
+        Parse `tokens` into a ParseTreeNode tree, or return None on a syntax
+        error. When `tokens` carries offsets (a TokenStream), every node gets
+        start/end character offsets; an empty subtree has start == end.
+        With a TreePolicy (parser/tree_policy.py) the tree is built compacted.
+        """
+        try:
+            return build_tree(self.event_batches(tokens), tokens, batched=True, policy=policy)
+        except ParseError:
+            return None
+
+
+ENTER = 'enter'
+TOKEN = 'token'
+EXIT = 'exit'
+ERROR = 'error'
+
+
+class ParseError(RuntimeError):
+    def __init__(self, index, kind, value=None):
+        self.index = index
+        self.kind = kind
+        self.value = value
+        if kind == '$':
+            message = f"Unexpected end of input at token {index}"
+        else:
+            message = f"Unexpected token {kind} ({value!r}) at token {index}"
+        super().__init__(message)
+
+
+class SyntaxDiagnostic:
+    """
+    One syntax error found by a recovering parse: the offending token (its
+    index, kind and value; '$' at the end of input), the terminals that
+    would have been accepted there and the tokens skipped to recover.
+    `offset` is the character offset of the offending token when the tokens
+    carry spans (a TokenStream), else None.
+    """
+
+    def __init__(self, index, kind, value, expected, skipped, tokens=None):
+        self.index = index
+        self.kind = kind
+        self.value = value
+        self.expected = expected
+        self.skipped = skipped
+        self.offset = None
+        if hasattr(tokens, 'span'):
+            if index < len(tokens):
+                self.offset = tokens.start(index)
+            elif len(tokens):
+                self.offset = tokens.end(len(tokens) - 1)
+            else:
+                self.offset = 0
+
+    @property
+    def message(self):
+        found = "end of input" if self.kind == '$' else f"token {self.kind} ({self.value!r})"
+        message = f"Unexpected {found} at token {self.index}; expected {', '.join(self.expected)}"
+        if self.skipped:
+            message += f" (skipped {len(self.skipped)} token{'s' if len(self.skipped) > 1 else ''})"
+        return message
+
+    def __repr__(self):
+        return f"SyntaxDiagnostic({self.message!r})"
+
+
+class _TokenCursor:
+    """
+    An iterator over tokens shared by parse_units() and the event_batches()
+    parses it starts, with one token of pushback for their lookahead.
+    `index` is the position of the next token.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.index = 0
+        self.pending = None
+        self.last = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = self.pending
+        if token is None:
+            try:
+                token = next(self.tokens)
+            except StopIteration:
+                self.last = None
+                raise
+        else:
+            self.pending = None
+        self.last = token
+        self.index += 1
+        return token
+
+    def peek(self):
+        if self.pending is None:
+            self.pending = next(self.tokens, None)
+            if self.pending is None:
+                return '$', None
+        return self.pending
+
+    def unread(self):
+        """Push back the last token returned (nothing after the end of input)."""
+        if self.last is not None:
+            self.pending = self.last
+            self.last = None
+            self.index -= 1
+
+
+def build_tree(events, tokens=None, batched=False, errors=None, first_index=0, policy=None):
+    """
+    Build a ParseTreeNode tree from an event stream (see DPDAParser.events),
+    or from lists of events with batched=True. When `tokens` carries offsets
+    (a TokenStream), nodes get start/end offsets as in
+    DPDAParser.parse_with_tree. ERROR events become 'ERROR' nodes whose
+    children are the skipped tokens; their diagnostics are appended to
+    `errors` when it is given. `first_index` is the position in `tokens` of
+    the first token the events refer to. With a TreePolicy, nodes are
+    inlined, flattened and dropped as it says while the tree is built.
+    """
+    if not batched:
+        events = [events]
+    keeps, drops = policy.hooks() if policy is not None else (None, None)
+    spans = getattr(tokens, 'span', None)
+    count = len(tokens) if spans else 0
+    index = first_index
+    last_end = tokens.end(first_index - 1) if spans and 0 < first_index <= count else 0
+    root = None
+    node = None
+    # per open non-terminal: the enclosing symbol, the node its children
+    # went to before it, and whether it got a node of its own
+    path = []
+    push = path.append
+    pop = path.pop
+    symbol = None
+    Node = ParseTreeNode
+    for batch in events:
+        for event in batch:
+            tag = event[0]
+            if tag == TOKEN:
+                leaf = Node(event[1], event[2])
+                node.children.append(leaf)
+                if spans and index < count:
+                    leaf.start, leaf.end = spans(index)
+                    last_end = leaf.end
+                index += 1
+            elif tag == ENTER:
+                name = event[1]
+                if keeps is not None and node is not None and not keeps(name, symbol):
+                    push((symbol, node, False))
+                    symbol = name
+                    continue
+                child = Node(name)
+                if node is None:
+                    root = child
+                else:
+                    node.children.append(child)
+                push((symbol, node, True))
+                symbol = name
+                if spans:
+                    child.start = tokens.start(index) if index < count else last_end
+                node = child
+            elif tag == EXIT:
+                symbol, parent, created = pop()
+                if not created:
+                    continue
+                if spans:
+                    node.end = max(last_end, node.start)
+                if drops is not None and parent is not None and not node.children and drops(node.symbol):
+                    parent.children.pop()
+                node = parent
             else:
-                root = node
-            if rhs_symbols != ['eps']:
-                for sym in reversed(rhs_symbols):
-                    stack.append((sym, node))
-        if index == len(input_tokens):
-            return root
-        return None
+                diagnostic = event[1]
+                if errors is not None:
+                    errors.append(diagnostic)
+                error = Node('ERROR', diagnostic.message)
+                (node or root).children.append(error)
+                if spans:
+                    error.start = tokens.start(index) if index < count else last_end
+                for kind, value in diagnostic.skipped:
+                    leaf = Node(kind, value)
+                    error.children.append(leaf)
+                    if spans and index < count:
+                        leaf.start, leaf.end = spans(index)
+                        last_end = leaf.end
+                    index += 1
+                if spans:
+                    error.end = max(last_end, error.start)
+                    if node is None:
+                        # tokens skipped after the end of the start symbol
+                        root.end = error.end
+    return root
@@ -0,0 +1,299 @@
+from collections.abc import Mapping
+
+from parser.grammar import Grammar
+
+
+def strongly_connected_components(nodes, edges):
+    """
+    Iterative Tarjan. Yields components (lists of nodes) in reverse
+    topological order: a component comes after every component it reaches.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    counter = 0
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges[root]))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if w not in index:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(edges[w])))
+                    break
+                elif w in on_stack and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    yield component
+
+
+def propagate(nodes, edges, direct, empty=set):
+    """
+    Solve set(v) = direct[v] | set(w) for every edge v -> w by visiting each
+    strongly connected component once, successors first. Every member of a
+    component shares the same resulting set. Works for any value type with
+    `|=` (Python sets, or ints used as bitsets with empty=int).
+    """
+    result = {}
+    for component in strongly_connected_components(nodes, edges):
+        members = set(component)
+        value = empty()
+        for v in component:
+            value |= direct[v]
+            for w in edges[v]:
+                if w not in members:
+                    value |= result[w]
+        for v in component:
+            result[v] = value
+    return result
+
+
+class GraphLL1Helper:
+    """
+    Drop-in replacement for LL1Helper for large grammars.
+
+    Instead of re-scanning every production until nothing changes, it
+    computes nullable non-terminals with a worklist, turns FIRST and FOLLOW
+    into "includes" graphs over non-terminals and solves each graph in one
+    pass over its strongly connected components. Every production is scanned
+    a constant number of times.
+    """
+
+    def __init__(self, grammar: Grammar):
+        self.grammar = grammar
+        self.non_terminal_ids = list(range(grammar.terminal_count, len(grammar.symbols)))
+        # undeclared body symbols are ignored by LL1Helper; mirror that
+        self.declared = [sym in grammar.terminals for sym in grammar.symbols[:grammar.terminal_count]]
+        self.nullable = self._compute_nullable()
+        first_ids = self._compute_first()
+        follow_ids = self._compute_follow(first_ids)
+        self.first_ids = first_ids
+        self.follow_ids = follow_ids
+
+        symbols = grammar.symbols
+        self.first = {}
+        self.follow = {}
+        for sym in grammar.non_terminals:
+            sid = grammar.symbol_ids[sym]
+            self.first[sym] = {symbols[t] for t in first_ids[sid]}
+            if sid in self.nullable:
+                self.first[sym].add('eps')
+            self.follow[sym] = {symbols[t] for t in follow_ids[sid]}
+
+    def _empty(self):
+        return set()
+
+    def _single(self, terminal):
+        return {terminal}
+
+    def _compute_nullable(self):
+        g = self.grammar
+        remaining = []
+        occurrences = {nt: [] for nt in self.non_terminal_ids}
+        nullable = set()
+        queue = []
+        for number, body in enumerate(g.production_bodies):
+            blocked = any(sym < g.terminal_count for sym in body)
+            remaining.append(len(body) if not blocked else -1)
+            if blocked:
+                continue
+            for sym in body:
+                occurrences[sym].append(number)
+            if not body and g.production_heads[number] not in nullable:
+                nullable.add(g.production_heads[number])
+                queue.append(g.production_heads[number])
+        while queue:
+            sym = queue.pop()
+            for number in occurrences[sym]:
+                remaining[number] -= 1
+                head = g.production_heads[number]
+                if remaining[number] == 0 and head not in nullable:
+                    nullable.add(head)
+                    queue.append(head)
+        return nullable
+
+    def _first_graph(self):
+        g = self.grammar
+        edges = {nt: [] for nt in self.non_terminal_ids}
+        direct = {nt: self._empty() for nt in self.non_terminal_ids}
+        for head, body in zip(g.production_heads, g.production_bodies):
+            for sym in body:
+                if sym < g.terminal_count:
+                    if self.declared[sym]:
+                        direct[head] |= self._single(sym)
+                    break
+                if sym != head:
+                    edges[head].append(sym)
+                if sym not in self.nullable:
+                    break
+        return edges, direct
+
+    def _follow_graph(self, first_ids):
+        g = self.grammar
+        edges = {nt: [] for nt in self.non_terminal_ids}
+        direct = {nt: self._empty() for nt in self.non_terminal_ids}
+        start = g.symbol_ids.get(g.start_symbol)
+        if start in direct:
+            direct[start] |= self._single(0)
+        for head, body in zip(g.production_heads, g.production_bodies):
+            # walk right to left keeping FIRST of the suffix seen so far
+            suffix = self._empty()
+            suffix_nullable = True
+            for sym in reversed(body):
+                if sym < g.terminal_count:
+                    suffix = self._single(sym) if self.declared[sym] else self._empty()
+                    suffix_nullable = False
+                    continue
+                direct[sym] |= suffix
+                if suffix_nullable and sym != head:
+                    edges[sym].append(head)
+                if sym in self.nullable:
+                    suffix = suffix | first_ids[sym]
+                else:
+                    suffix = first_ids[sym]
+                    suffix_nullable = False
+        return edges, direct
+
+    def _compute_first(self):
+        edges, direct = self._first_graph()
+        return propagate(self.non_terminal_ids, edges, direct, self._empty)
+
+    def _compute_follow(self, first_ids):
+        edges, direct = self._follow_graph(first_ids)
+        return propagate(self.non_terminal_ids, edges, direct, self._empty)
+
+    def display_first(self):
+        print("\nFirst sets:")
+        for sym, s in self.first.items():
+            print(f"First({sym}) = {{ {', '.join(s)} }}")
+
+    def display_follow(self):
+        print("\nFollow sets:")
+        for sym, s in self.follow.items():
+            print(f"Follow({sym}) = {{ {', '.join(s)} }}")
+
+
+def iter_bits(bits):
+    """Yield the indexes of the set bits of a non-negative int, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class DecodedSets(Mapping):
+    """Read-only {non-terminal: set of names} view over bitset rows."""
+
+    def __init__(self, grammar, rows, eps_bit=0):
+        self.grammar = grammar
+        self.rows = rows
+        self.eps_bit = eps_bit
+
+    def __getitem__(self, sym):
+        bits = self.rows[self.grammar.symbol_ids[sym]]
+        names = {self.grammar.symbols[t] for t in iter_bits(bits & ~self.eps_bit)}
+        if bits & self.eps_bit:
+            names.add('eps')
+        return names
+
+    def __iter__(self):
+        return iter(self.grammar.non_terminals)
+
+    def __len__(self):
+        return len(self.grammar.non_terminals)
+
+
+class BitsetLL1Helper(GraphLL1Helper):
+    """
+    GraphLL1Helper with every FIRST/FOLLOW set stored as an int bitset over
+    terminal IDs (bit 0 is '$'). Union, difference and change detection are
+    single int operations.
+
+    `first_bits`/`follow_bits` hold the raw rows (FIRST rows include
+    `eps_bit` for nullable non-terminals); `first`/`follow` decode a row into
+    a set of names only when it is looked up, so LL1ParsingTable and the
+    display methods work unchanged.
+
+    method='scc' propagates over strongly connected components like the base
+    class; method='closure' instead takes the reflexive-transitive closure of
+    the non-terminal "includes" relation as a boolean matrix (one int per
+    row, Warshall's algorithm) and ORs the direct rows through it.
+    """
+
+    def __init__(self, grammar: Grammar, method='scc'):
+        if method not in ('scc', 'closure'):
+            raise ValueError(f"Unknown method: {method}")
+        self.grammar = grammar
+        self.method = method
+        self.non_terminal_ids = list(range(grammar.terminal_count, len(grammar.symbols)))
+        self.declared = [sym in grammar.terminals for sym in grammar.symbols[:grammar.terminal_count]]
+        self.eps_bit = 1 << grammar.terminal_count
+        self.nullable = self._compute_nullable()
+        self.first_ids = self._compute_first()
+        self.follow_ids = self._compute_follow(self.first_ids)
+        self.first_bits = {nt: bits | (self.eps_bit if nt in self.nullable else 0)
+                           for nt, bits in self.first_ids.items()}
+        self.follow_bits = self.follow_ids
+        self.first = DecodedSets(grammar, self.first_bits, self.eps_bit)
+        self.follow = DecodedSets(grammar, self.follow_bits)
+
+    def _empty(self):
+        return 0
+
+    def _single(self, terminal):
+        return 1 << terminal
+
+    def _closure(self, edges, direct):
+        offset = self.grammar.terminal_count
+        count = len(self.non_terminal_ids)
+        reach = [1 << i for i in range(count)]
+        for nt, targets in edges.items():
+            for target in targets:
+                reach[nt - offset] |= 1 << (target - offset)
+        for k in range(count):
+            bit = 1 << k
+            row = reach[k]
+            for i in range(count):
+                if reach[i] & bit:
+                    reach[i] |= row
+        rows = [direct[nt] for nt in self.non_terminal_ids]
+        result = {}
+        for i, nt in enumerate(self.non_terminal_ids):
+            value = 0
+            for j in iter_bits(reach[i]):
+                value |= rows[j]
+            result[nt] = value
+        return result
+
+    def _compute_first(self):
+        if self.method == 'closure':
+            return self._closure(*self._first_graph())
+        return super()._compute_first()
+
+    def _compute_follow(self, first_ids):
+        if self.method == 'closure':
+            return self._closure(*self._follow_graph(first_ids))
+        return super()._compute_follow(first_ids)
@@ -7,6 +7,7 @@ class Grammar:
         self.terminals = set()
         self.productions = defaultdict(list)
         self._parse_grammar(grammar_text)
+        self._intern()
 
     def _parse_grammar(self, text):
         lines = text.strip().splitlines()
@@ -24,4 +25,89 @@ class Grammar:
                 left, right = map(str.strip, line.split('->', 1))
                 alternatives = [alt.strip() for alt in right.split('|')]
                 for alt in alternatives:
-                    self.productions[left].append(alt)
\ No newline at end of file
+                    self.productions[left].append(alt)
+
+    def _intern(self):
+        """
+        Number every symbol and production once so that later passes work on
+        pre-split tuples instead of re-splitting body strings.
+
+        Symbol IDs are dense: '$' is 0, terminals follow, then non-terminals;
+        any ID below `terminal_count` is a terminal. Symbols used in a body
+        without being declared are numbered as terminals. 'eps' is not a
+        symbol: an epsilon body is the empty tuple.
+        """
+        heads = list(self.productions)
+        used = {sym for bodies in self.productions.values() for body in bodies for sym in body.split()}
+        non_terminals = sorted(self.non_terminals | set(heads))
+        terminals = sorted((self.terminals | used) - set(non_terminals) - {'eps', '$'})
+        self.symbols = ['$'] + terminals + non_terminals
+        self.symbol_ids = {sym: i for i, sym in enumerate(self.symbols)}
+        self.terminal_count = 1 + len(terminals)
+
+        self.split_productions = []
+        self.production_heads = []
+        self.production_bodies = []
+        self.push_sequences = []
+        self.production_index = {}
+        for head in heads:
+            for body in self.productions[head]:
+                self._add_interned(head, tuple(body.split()))
+
+    def _add_interned(self, head, symbols):
+        ids = tuple(self.symbol_ids[sym] for sym in symbols if sym != 'eps')
+        number = len(self.split_productions)
+        self.split_productions.append((head, symbols))
+        self.production_heads.append(self.symbol_ids[head])
+        self.production_bodies.append(ids)
+        self.push_sequences.append(ids[::-1])
+        self.production_index.setdefault((head, ' '.join(symbols)), number)
+        return number
+
+    def add_production(self, head, body):
+        """
+        Append `head -> body` and return its production number. Existing
+        symbol IDs are kept unless the production introduces a new symbol,
+        in which case the whole symbol table is renumbered.
+        """
+        symbols = tuple(body.split())
+        text = ' '.join(symbols)
+        self.non_terminals.add(head)
+        self.productions[head].append(text)
+        known = all(sym in self.symbol_ids for sym in symbols if sym != 'eps')
+        if known and self.symbol_ids.get(head, -1) >= self.terminal_count:
+            return self._add_interned(head, symbols)
+        self._intern()
+        return max(i for i, entry in enumerate(self.split_productions) if entry == (head, symbols))
+
+    def remove_production(self, head, body):
+        """
+        Remove (the first copy of) `head -> body` and return the number it
+        had. Later productions move down by one; symbol IDs are unchanged.
+        """
+        text = ' '.join(body.split())
+        if (head, text) not in self.production_index:
+            raise ValueError(f"No production {head} -> {text}")
+        number = self.production_index[(head, text)]
+        bodies = self.productions[head]
+        for i, alt in enumerate(bodies):
+            if ' '.join(alt.split()) == text:
+                del bodies[i]
+                break
+        if not bodies:
+            del self.productions[head]
+        del self.split_productions[number]
+        del self.production_heads[number]
+        del self.production_bodies[number]
+        del self.push_sequences[number]
+        self.production_index = {}
+        for i, (h, syms) in enumerate(self.split_productions):
+            self.production_index.setdefault((h, ' '.join(syms)), i)
+        return number
+
+    def production_number(self, head, body):
+        return self.production_index[(head, ' '.join(body.split()))]
+
+    def production_string(self, number):
+        head, symbols = self.split_productions[number]
+        return f"{head} -> {' '.join(symbols)}"
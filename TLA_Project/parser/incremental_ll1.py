@@ -0,0 +1,258 @@
+from parser.first_follow import BitsetLL1Helper, DecodedSets, iter_bits
+from parser.grammar import Grammar
+from parser.ll1_table import LL1ParsingTable
+
+
+class IncrementalLL1:
+    """
+    Keeps nullable, FIRST, FOLLOW and an LL1ParsingTable in sync with a
+    Grammar while single productions are added or removed.
+
+    Each edit recomputes only the non-terminals whose sets can depend on the
+    edited production (found by walking the dependency edges backwards from
+    it), resetting them and re-solving them with a worklist while every other
+    set stays fixed. Only the table rows whose predict sets can change are
+    rebuilt, and the changed cells are returned as
+    (non_terminal, terminal, old_body, new_body) tuples, with None for an
+    empty cell.
+
+    Edits that introduce a new symbol renumber the symbol table, so they fall
+    back to a full rebuild (still reporting the changed cells).
+    """
+
+    def __init__(self, grammar: Grammar):
+        self.grammar = grammar
+        self._rebuild()
+
+    def _rebuild(self):
+        g = self.grammar
+        helper = BitsetLL1Helper(g)
+        self.terminal_count = g.terminal_count
+        self.declared = helper.declared
+        self.nullable = set(helper.nullable)
+        self.first_rows = dict(helper.first_ids)
+        self.follow_rows = dict(helper.follow_ids)
+        self.by_head = {nt: [] for nt in helper.non_terminal_ids}
+        self.uses = {nt: [] for nt in helper.non_terminal_ids}
+        for (head, symbols), body in zip(g.split_productions, g.production_bodies):
+            self._index(g.symbol_ids[head], body, ' '.join(symbols))
+
+        self.first_view = {}
+        self.table = LL1ParsingTable.__new__(LL1ParsingTable)
+        self.table.grammar = g
+        self.table.first = DecodedSets(g, self.first_view, 1 << self.terminal_count)
+        self.table.follow = DecodedSets(g, self.follow_rows)
+        self._sync_first_view(self.first_rows)
+        self.table.table = LL1ParsingTable(g, self.table.first, self.table.follow).table
+
+    def _index(self, head, body, text):
+        record = (head, body, text)
+        self.by_head[head].append(record)
+        for sym in set(body):
+            if sym >= self.terminal_count:
+                self.uses[sym].append(record)
+
+    def _unindex(self, head, text):
+        records = self.by_head[head]
+        for i, record in enumerate(records):
+            if record[2] == text:
+                del records[i]
+                break
+        for sym in set(record[1]):
+            if sym >= self.terminal_count:
+                self.uses[sym].remove(record)
+        return record
+
+    def _sync_first_view(self, non_terminals):
+        eps_bit = 1 << self.terminal_count
+        for nt in non_terminals:
+            self.first_view[nt] = self.first_rows[nt] | (eps_bit if nt in self.nullable else 0)
+
+    def _first_of(self, body, start=0):
+        """(FIRST bits, nullable) of body[start:]."""
+        bits = 0
+        for sym in body[start:]:
+            if sym < self.terminal_count:
+                return bits | (1 << sym if self.declared[sym] else 0), False
+            bits |= self.first_rows[sym]
+            if sym not in self.nullable:
+                return bits, False
+        return bits, True
+
+    @staticmethod
+    def _reach(seeds, successors):
+        seen = set(seeds)
+        stack = list(seeds)
+        while stack:
+            for nxt in successors(stack.pop()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    @staticmethod
+    def _solve(affected, evaluate, rows, dependents):
+        """Least fixpoint of rows[x] = evaluate(x) over `affected`, all other rows fixed."""
+        old = {x: rows[x] for x in affected}
+        for x in affected:
+            rows[x] = 0
+        pending = list(affected)
+        queued = set(affected)
+        while pending:
+            x = pending.pop()
+            queued.discard(x)
+            value = evaluate(x)
+            if value != rows[x]:
+                rows[x] = value
+                for y in dependents(x):
+                    if y in affected and y not in queued:
+                        queued.add(y)
+                        pending.append(y)
+        return {x for x in affected if rows[x] != old[x]}
+
+    def add_production(self, head, body):
+        symbols_before = list(self.grammar.symbols)
+        self.grammar.add_production(head, body)
+        if self.grammar.symbols != symbols_before:
+            return self._full_update()
+        g = self.grammar
+        head_id = g.symbol_ids[head]
+        text = ' '.join(body.split())
+        self._index(head_id, g.production_bodies[g.production_index[(head, text)]], text)
+        return self._update(head_id, self.by_head[head_id][-1])
+
+    def remove_production(self, head, body):
+        text = ' '.join(body.split())
+        self.grammar.remove_production(head, body)
+        head_id = self.grammar.symbol_ids[head]
+        record = self._unindex(head_id, text)
+        return self._update(head_id, record)
+
+    def _full_update(self):
+        old_table = {nt: dict(row) for nt, row in self.table.table.items()}
+        self._rebuild()
+        changes = []
+        for nt in set(old_table) | set(self.table.table):
+            old_row = old_table.get(nt, {})
+            new_row = self.table.table.get(nt, {})
+            for t in set(old_row) | set(new_row):
+                if old_row.get(t) != new_row.get(t):
+                    changes.append((nt, t, old_row.get(t), new_row.get(t)))
+        return changes
+
+    def _update(self, head, record):
+        tc = self.terminal_count
+        by_head = self.by_head
+        uses = self.uses
+
+        # nullable: only productions without terminals can make a head nullable
+        def nullable_users(sym):
+            return (h for h, body, _ in uses[sym] if all(s >= tc for s in body))
+
+        affected = self._reach([head], nullable_users)
+        old_nullable = self.nullable & affected
+        self.nullable -= affected
+        pending = [nt for nt in affected
+                   if any(all(s in self.nullable for s in body) for _, body, _ in by_head[nt])]
+        while pending:
+            nt = pending.pop()
+            if nt in self.nullable:
+                continue
+            self.nullable.add(nt)
+            for h, body, _ in uses[nt]:
+                if h in affected and h not in self.nullable and all(s in self.nullable for s in body):
+                    pending.append(h)
+        changed_nullable = old_nullable ^ (self.nullable & affected)
+        maybe_nullable = self.nullable | old_nullable
+
+        # FIRST: X depends on Y when Y can start one of X's bodies
+        def first_users(sym):
+            for h, body, _ in uses[sym]:
+                for s in body:
+                    if s == sym:
+                        yield h
+                        break
+                    if s < tc or s not in maybe_nullable:
+                        break
+
+        affected = self._reach({head} | changed_nullable, first_users)
+        changed_first = self._solve(
+            affected,
+            lambda nt: self._or(self._first_of(body)[0] for _, body, _ in by_head[nt]),
+            self.first_rows,
+            first_users,
+        )
+        self._sync_first_view(affected | changed_nullable)
+
+        # FOLLOW: seeds are the non-terminals of the edited body and those
+        # that can be followed by a symbol whose FIRST/nullable changed
+        seeds = {s for s in record[1] if s >= tc}
+        for sym in changed_first | changed_nullable:
+            for _, body, _ in uses[sym]:
+                for j, s in enumerate(body):
+                    if s != sym:
+                        continue
+                    for i in range(j - 1, -1, -1):
+                        if body[i] < tc:
+                            break
+                        seeds.add(body[i])
+                        if body[i] not in maybe_nullable:
+                            break
+
+        def follow_dependents(nt):
+            # FOLLOW(nt) flows into every B that can end one of nt's bodies
+            for _, body, _ in by_head[nt]:
+                for s in reversed(body):
+                    if s < tc:
+                        break
+                    yield s
+                    if s not in maybe_nullable:
+                        break
+
+        start = self.grammar.symbol_ids.get(self.grammar.start_symbol)
+
+        def evaluate_follow(nt):
+            bits = 1 if nt == start else 0
+            for h, body, _ in uses[nt]:
+                for i, s in enumerate(body):
+                    if s == nt:
+                        first, nullable = self._first_of(body, i + 1)
+                        bits |= first
+                        if nullable:
+                            bits |= self.follow_rows[h]
+            return bits
+
+        affected = self._reach(seeds, follow_dependents)
+        changed_follow = self._solve(affected, evaluate_follow, self.follow_rows, follow_dependents)
+
+        # table rows whose predict sets may have changed
+        rows = {head} | changed_follow
+        for sym in changed_first | changed_nullable:
+            rows.update(h for h, _, _ in uses[sym])
+        return self._rebuild_rows(rows)
+
+    @staticmethod
+    def _or(values):
+        bits = 0
+        for value in values:
+            bits |= value
+        return bits
+
+    def _rebuild_rows(self, rows):
+        symbols = self.grammar.symbols
+        changes = []
+        for nt in rows:
+            name = symbols[nt]
+            new_row = {}
+            for _, body, text in self.by_head[nt]:
+                bits, nullable = self._first_of(body)
+                if nullable:
+                    bits |= self.follow_rows[nt]
+                for t in iter_bits(bits):
+                    new_row[symbols[t]] = text
+            old_row = self.table.table.get(name, {})
+            for t in set(old_row) | set(new_row):
+                if old_row.get(t) != new_row.get(t):
+                    changes.append((name, t, old_row.get(t), new_row.get(t)))
+            self.table.table[name] = new_row
+        return changes
@@ -0,0 +1,380 @@
+from lexer.incremental import IncrementalLexer
+from lexer.token_stream import ShiftTree
+from parser.dpda_parser import DPDAParser, ParseError, build_tree
+from parser.traversal import pre_order
+
+
+class ParsedSource:
+    """
+    A source buffer with its TokenStream and parse tree, kept up to date by
+    IncrementalParser.edit(). `diagnostics` is empty for a valid source;
+    otherwise the tree is the partial tree of a recovering parse.
+
+    Like a TokenStream, the tree is shifted lazily: after an edit, the
+    offsets of the top-level units after it are only brought up to date
+    when `tree` is read (see UnitIndex).
+    """
+
+    def __init__(self, tokens, tree, diagnostics):
+        self.tokens = tokens
+        self._set_tree(tree, diagnostics)
+
+    def _set_tree(self, tree, diagnostics):
+        self._tree = tree
+        self.diagnostics = diagnostics
+        self.units = UnitIndex(tree) if not diagnostics else None
+
+    @property
+    def source(self):
+        return str(self.tokens.source)
+
+    @property
+    def tree(self):
+        """The parse tree, with every offset applied."""
+        if self.units is not None:
+            self.units.flush(self.tokens)
+        return self._tree
+
+
+class UnitIndex:
+    """
+    The top-level units of a tree: the root and the right-recursive list
+    below it (Program -> Function Program) form the spine, and every other
+    child of a spine node is a unit (each Function). Looking up the unit at
+    an offset is a binary search instead of a walk down the spine.
+
+    Offsets of a unit's nodes are stored without its pending delta, which
+    an edit adds to all later units in O(log n) (see ShiftTree). A unit is
+    brought up to date by materialize() before it is reparsed, and
+    flush() applies every pending delta and fixes the spine nodes.
+    """
+
+    def __init__(self, root):
+        self.spines = []  # the root and the list nodes below it
+        self.units = []
+        self.owners = []  # spine index of each unit
+        self.stale = False  # spine offsets need fixing
+        self._extend(root)
+        self.shifts = ShiftTree([0] * len(self.units))
+
+    def _extend(self, spine):
+        symbol = spine.symbol
+        while spine is not None:
+            owner = len(self.spines)
+            self.spines.append(spine)
+            children = spine.children
+            following = children[-1] if children and children[-1].symbol == symbol else None
+            for child in children:
+                if child is not following:
+                    self.units.append(child)
+                    self.owners.append(owner)
+            spine = following
+
+    def __len__(self):
+        return len(self.units)
+
+    def start(self, i):
+        return self.units[i].start + self.shifts.delta(i)
+
+    def end(self, i):
+        return self.units[i].end + self.shifts.delta(i)
+
+    def find(self, offset):
+        """Index of the last unit starting at or before `offset`, or -1."""
+        lo, hi = 0, len(self.units)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.start(mid) <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def first_of(self, owner):
+        """Index of the first unit held by spine node `owner` (len(self) if it holds none)."""
+        owners = self.owners
+        lo, hi = 0, len(owners)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if owners[mid] < owner:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def materialize(self, i):
+        """Apply unit i's pending delta to its nodes."""
+        delta = self.shifts.delta(i)
+        if delta:
+            for node in pre_order(self.units[i]):
+                node.start += delta
+                node.end += delta
+            self.shifts.add(i, -delta)
+            self.shifts.add(i + 1, delta)
+
+    def shift_after(self, i, delta):
+        """Move every unit after unit i by `delta`."""
+        if delta:
+            self.shifts.add(i + 1, delta)
+        self.stale = True
+
+    def replace(self, i, node):
+        spine = self.spines[self.owners[i]]
+        old = self.units[i]
+        spine.children[next(k for k, child in enumerate(spine.children) if child is old)] = node
+        self.units[i] = node
+
+    def replace_spine(self, owner, spine):
+        """
+        Put `spine` in place of spine node `owner` and of everything below
+        it; the units before it keep their pending deltas.
+        """
+        keep = self.first_of(owner)
+        deltas = [self.shifts.delta(i) for i in range(keep)]
+        if owner:
+            self.spines[owner - 1].children[-1] = spine
+        del self.spines[owner:]
+        del self.units[keep:]
+        del self.owners[keep:]
+        self._extend(spine)
+        self.shifts = ShiftTree(deltas + [0] * (len(self.units) - keep))
+        self.stale = True
+
+    def flush(self, tokens):
+        if not self.stale:
+            return
+        for i in range(len(self.units)):
+            self.materialize(i)
+        end = tokens.end(len(tokens) - 1) if len(tokens) else 0
+        units = self.units
+        first = 0
+        for owner, spine in enumerate(self.spines):
+            # every spine node reaches the end of the input
+            if first < len(units) and self.owners[first] == owner:
+                spine.start = units[first].start
+            else:
+                spine.start = end
+            spine.end = end
+            while first < len(units) and self.owners[first] == owner:
+                first += 1
+        self.stale = False
+
+
+class IncrementalParser:
+    """
+    Reparses only the part of a tree that an edit can affect.
+
+    An edit is re-lexed with IncrementalLexer, which reports the range of
+    tokens that changed. The parser finds the top-level unit holding that
+    range (UnitIndex), takes the innermost subtree of it whose token range
+    contains the change and, working outwards, reparses the first one
+    whose non-terminal derives exactly the new tokens of its range.
+    Because the tokens before the subtree and the lookahead after it are
+    unchanged, the LL(1) parse of everything outside it is the same as
+    before, so the new subtree is spliced in and the rest of the tree is
+    kept. The nodes after it in the same unit are moved with the text; the
+    later units only get a pending delta. So the work per edit is
+    proportional to the unit, not to the file.
+
+    An edit that does not fit inside one unit (adding or removing a unit)
+    reparses the spine from the unit where it starts. Trees with syntax
+    errors are not reused: while a source has diagnostics, every edit
+    reparses it in full (with recovery).
+    """
+
+    def __init__(self, parser: DPDAParser, lexer):
+        self.parser = parser
+        self.lexer = IncrementalLexer(lexer)
+
+    def parse(self, source):
+        tokens = self.lexer.tokenize(source)
+        tree, diagnostics = self.parser.parse_with_recovery(tokens)
+        return ParsedSource(tokens, tree, diagnostics)
+
+    def edit(self, document: ParsedSource, offset, deleted, inserted):
+        """
+        Replace `deleted` characters at `offset` with `inserted` and update
+        `document` in place. Returns the node that was reparsed (the root
+        after a full reparse). A LexerError from the edited text propagates
+        and leaves `document` unchanged.
+        """
+        tokens = document.tokens
+        units = document.units
+        if units is None:
+            self.lexer.apply_edit(tokens, offset, deleted, inserted)
+            return self._reparse_all(document)
+
+        old_count = len(tokens)
+        # the first token IncrementalLexer re-lexes: one before the edit
+        behind = max(tokens.find(offset) - 1, 0)
+        candidates = []  # (first changed token, unit, path, token ranges)
+        for first in (behind, behind + 1):
+            if first >= old_count:
+                break
+            unit = units.find(tokens.start(first))
+            if unit < 0 or candidates and unit == candidates[0][1]:
+                break
+            units.materialize(unit)
+            candidates.append((first, unit) + self._path(units.units[unit], tokens, first))
+        behind_token = (tokens.kinds[behind], tokens.start(behind), tokens.end(behind)) if old_count else None
+        owner = units.owners[candidates[0][1]] if candidates else 0
+        first_unit = units.first_of(owner)
+        spine_first = self._token_at(tokens, units.start(first_unit)) if first_unit < len(units) else old_count
+
+        _, (first, old_stop, new_stop) = self.lexer.apply_edit(tokens, offset, deleted, inserted)
+        token_delta = new_stop - old_stop
+        char_delta = len(inserted) - deleted
+        if len(candidates) > 1 and not (first < new_stop and behind_token == (
+                tokens.kinds[first], tokens.start(first), tokens.end(first))):
+            # the token before the edit changed, so the edit is not inside the next unit
+            del candidates[1:]
+
+        for lo, unit, path, ranges in candidates:
+            for depth in range(len(path) - 1, -1, -1):
+                a, b = ranges[depth]
+                if not (a <= lo and old_stop <= b and a < b):
+                    continue
+                result = self._reparse(path[depth], tokens, a, b + token_delta)
+                if result is None:
+                    continue
+                old_start = path[0].start
+                at_end = b == old_count
+                if depth == 0:
+                    units.replace(unit, result)
+                else:
+                    self._splice(path, ranges, depth, result, tokens, at_end, char_delta)
+                self._move_units(units, unit, old_start, tokens, at_end, char_delta)
+                return result
+
+        spine = units.spines[owner]
+        result = self._reparse(spine, tokens, spine_first, len(tokens))
+        if result is None:
+            return self._reparse_all(document)
+        if owner == 0:
+            document._set_tree(result, [])
+        else:
+            units.replace_spine(owner, result)
+        return result
+
+    def _reparse_all(self, document):
+        tree, diagnostics = self.parser.parse_with_recovery(document.tokens)
+        document._set_tree(tree, diagnostics)
+        return tree
+
+    @staticmethod
+    def _token_at(tokens, offset):
+        """Index of the first token starting at or after `offset`."""
+        index = tokens.find(offset)
+        while index < len(tokens) and tokens.start(index) < offset:
+            index += 1
+        return index
+
+    def _path(self, unit, tokens, first):
+        """
+        Non-terminals from `unit` down to the innermost one holding token
+        `first`, with their (first, stop) token ranges before the edit.
+        """
+        position = tokens.start(first)
+        path = []
+        node = unit if unit.children else None
+        while node is not None:
+            path.append(node)
+            inner = None
+            for child in node.children:
+                if child.children and child.start <= position < child.end:
+                    inner = child
+                    break
+            node = inner
+        token_at = self._token_at
+        return path, [(token_at(tokens, node.start), token_at(tokens, node.end)) for node in path]
+
+    def _reparse(self, node, tokens, first, stop):
+        """Parse `node.symbol` from token `first`; the new subtree if it ends exactly at `stop`."""
+        parser = self.parser
+        symbol_id = parser.grammar.symbol_ids[node.symbol]
+        rest = (tokens[i] for i in range(first, len(tokens)))
+        try:
+            subtree = build_tree(parser.event_batches(rest, start=symbol_id), tokens,
+                                 batched=True, first_index=first)
+        except ParseError:
+            return None
+        if subtree.end > subtree.start:
+            end_index = tokens.find(subtree.end) + 1
+        else:
+            end_index = first
+        return subtree if end_index == stop else None
+
+    def _splice(self, chain, ranges, depth, subtree, tokens, at_end, char_delta):
+        old = chain[depth]
+        a, b = ranges[depth]
+        old_a_start = old.start
+        new_a_start = subtree.start
+        new_stop = tokens.find(subtree.end) + 1 if subtree.end > subtree.start else a
+        new_last_end = tokens.end(new_stop - 1) if new_stop else 0
+
+        parent = chain[depth - 1]
+        parent.children[parent.children.index(old)] = subtree
+
+        # ancestors: the first token moved if it is the subtree's, and the
+        # last token is either the subtree's or an unchanged, shifted one
+        for node, (node_a, node_b) in zip(chain[:depth], ranges):
+            if node_a == a:
+                node.start = new_a_start
+            node.end = max(new_last_end, node.start) if node_b == b else node.end + char_delta
+
+        # nodes left of the subtree only change if the first token moved
+        # (edits in leading whitespace); nodes right of it move with the text
+        left_moved = new_a_start != old_a_start
+        for level in range(depth):
+            node = chain[level]
+            child = chain[level + 1] if level + 1 < depth else subtree
+            index = next(i for i, c in enumerate(node.children) if c is child)
+            if left_moved:
+                for sibling in node.children[:index]:
+                    self._move_left(sibling, old_a_start, new_a_start)
+            for sibling in node.children[index + 1:]:
+                self._move_right(sibling, char_delta, new_last_end if at_end else None)
+
+    def _move_units(self, units, unit, old_start, tokens, at_end, char_delta):
+        """Move the units around a reparsed one, as _splice does within it."""
+        new_start = units.units[unit].start
+        if new_start != old_start:
+            for i in range(unit - 1, -1, -1):
+                units.materialize(i)
+                if units.units[i].start != old_start:
+                    break
+                self._move_left(units.units[i], old_start, new_start)
+        if at_end:
+            # no token follows: later units are empty and sit at the end of input
+            end_of_input = tokens.end(len(tokens) - 1) if len(tokens) else 0
+            for i in range(unit + 1, len(units)):
+                units.materialize(i)
+                self._move_right(units.units[i], 0, end_of_input)
+            units.shift_after(unit, 0)
+        else:
+            units.shift_after(unit, char_delta)
+
+    @staticmethod
+    def _move_left(node, old_start, new_start):
+        for n in pre_order(node):
+            if n.start == old_start:
+                n.start = new_start
+            if n.end == old_start:
+                n.end = new_start
+
+    def _move_right(self, node, char_delta, end_of_input):
+        stack = [node]
+        pop = stack.pop
+        extend = stack.extend
+        if end_of_input is not None:
+            # no token follows the subtree: only empty nodes at the end of input
+            while stack:
+                n = pop()
+                n.start = n.end = end_of_input
+                extend(n.children)
+        elif char_delta:
+            while stack:
+                n = pop()
+                n.start += char_delta
+                n.end += char_delta
+                extend(n.children)
@@ -1,3 +1,4 @@
+from array import array
 from parser.grammar import Grammar
 from collections import defaultdict
 
@@ -13,62 +14,58 @@ class LL1Helper:
         changed = True
         while changed:
             changed = False
-            for head in self.grammar.productions:
-                for body in self.grammar.productions[head]:
-                    symbols = body.split()
-                    i = 0
-                    nullable = True
-                    while i < len(symbols) and nullable:
-                        sym = symbols[i]
-                        if sym in self.grammar.terminals:
-                            if sym not in self.first[head]:
-                                self.first[head].add(sym)
-                                changed = True
-                            nullable = False
-                        elif sym in self.grammar.non_terminals:
-                            before = len(self.first[head])
-                            self.first[head].update(self.first[sym] - {'eps'})
-                            if 'eps' in self.first[sym]:
-                                nullable = True
-                            else:
-                                nullable = False
-                            if len(self.first[head]) > before:
-                                changed = True
-                        elif sym == 'eps':
-                            if 'eps' not in self.first[head]:
-                                self.first[head].add('eps')
-                                changed = True
-                            nullable = False
+            for head, symbols in self.grammar.split_productions:
+                i = 0
+                nullable = True
+                while i < len(symbols) and nullable:
+                    sym = symbols[i]
+                    if sym in self.grammar.terminals:
+                        if sym not in self.first[head]:
+                            self.first[head].add(sym)
+                            changed = True
+                        nullable = False
+                    elif sym in self.grammar.non_terminals:
+                        before = len(self.first[head])
+                        self.first[head].update(self.first[sym] - {'eps'})
+                        if 'eps' in self.first[sym]:
+                            nullable = True
                         else:
                             nullable = False
-                        i += 1
-                    if nullable:
+                        if len(self.first[head]) > before:
+                            changed = True
+                    elif sym == 'eps':
                         if 'eps' not in self.first[head]:
                             self.first[head].add('eps')
                             changed = True
+                        nullable = False
+                    else:
+                        nullable = False
+                    i += 1
+                if nullable:
+                    if 'eps' not in self.first[head]:
+                        self.first[head].add('eps')
+                        changed = True
 
     def _compute_follow(self):
         self.follow[self.grammar.start_symbol].add('$')
         changed = True
         while changed:
             changed = False
-            for head in self.grammar.productions:
-                for body in self.grammar.productions[head]:
-                    symbols = body.split()
-                    for i in range(len(symbols)):
-                        B = symbols[i]
-                        if B in self.grammar.non_terminals:
-                            beta = symbols[i+1:] if i+1 < len(symbols) else []
-                            follow_before = len(self.follow[B])
-                            if beta:
-                                first_beta = self._first_of_string(beta)
-                                self.follow[B].update(first_beta - {'eps'})
-                                if 'eps' in first_beta:
-                                    self.follow[B].update(self.follow[head])
-                            else:
+            for head, symbols in self.grammar.split_productions:
+                for i in range(len(symbols)):
+                    B = symbols[i]
+                    if B in self.grammar.non_terminals:
+                        beta = symbols[i+1:]
+                        follow_before = len(self.follow[B])
+                        if beta:
+                            first_beta = self._first_of_string(beta)
+                            self.follow[B].update(first_beta - {'eps'})
+                            if 'eps' in first_beta:
                                 self.follow[B].update(self.follow[head])
-                            if len(self.follow[B]) > follow_before:
-                                changed = True
+                        else:
+                            self.follow[B].update(self.follow[head])
+                        if len(self.follow[B]) > follow_before:
+                            changed = True
 
     def _first_of_string(self, symbols):
         result = set()
@@ -106,15 +103,14 @@ class LL1ParsingTable:
         self._build_table()
 
     def _build_table(self):
-        for head in self.grammar.productions:
-            for body in self.grammar.productions[head]:
-                symbols = body.split()
-                first_body = self._first_of_string(symbols)
-                for terminal in first_body - {'eps'}:
+        for head, symbols in self.grammar.split_productions:
+            body = ' '.join(symbols)
+            first_body = self._first_of_string(symbols)
+            for terminal in first_body - {'eps'}:
+                self.table[head][terminal] = body
+            if 'eps' in first_body:
+                for terminal in self.follow[head]:
                     self.table[head][terminal] = body
-                if 'eps' in first_body:
-                    for terminal in self.follow[head]:
-                        self.table[head][terminal] = body
 
     def _first_of_string(self, symbols):
         result = set()
@@ -134,4 +130,43 @@ class LL1ParsingTable:
         return result
 
     def get_table(self):
-        return {(nt, t): f"{nt} -> {body}" for nt in self.table for t, body in self.table[nt].items()}
\ No newline at end of file
+        return {(nt, t): f"{nt} -> {body}" for nt in self.table for t, body in self.table[nt].items()}
+
+    def get_dense_table(self):
+        return DenseParseTable.from_parse_table(self.grammar, self.get_table())
+
+class DenseParseTable:
+    """
+    LL(1) table as one flat array('i') indexed by non-terminal ID and terminal
+    ID, holding production numbers (see Grammar.production_bodies) and ERROR
+    for empty cells. Row `nt` starts at nt * width - base, so a lookup is a
+    single multiply-add and index. The last column of every row is reserved
+    for token kinds the grammar does not know and is always ERROR.
+    """
+
+    ERROR = -1
+
+    def __init__(self, grammar: Grammar):
+        self.terminal_count = grammar.terminal_count
+        self.non_terminal_count = len(grammar.symbols) - grammar.terminal_count
+        self.width = self.terminal_count + 1
+        self.base = self.terminal_count * self.width
+        self.cells = array('i', [self.ERROR]) * (self.non_terminal_count * self.width)
+
+    @classmethod
+    def from_parse_table(cls, grammar: Grammar, parse_table):
+        """Build from the {(nt, t): "nt -> body"} dict returned by get_table()."""
+        dense = cls(grammar)
+        for (nt, t), rule in parse_table.items():
+            _, body = rule.split('->', 1)
+            dense.set(grammar.symbol_ids[nt], grammar.symbol_ids[t], grammar.production_number(nt, body))
+        return dense
+
+    def set(self, nt_id, t_id, production):
+        self.cells[nt_id * self.width + t_id - self.base] = production
+
+    def lookup(self, nt_id, t_id):
+        return self.cells[nt_id * self.width + t_id - self.base]
+
+    def nbytes(self):
+        return self.cells.itemsize * len(self.cells)
@@ -0,0 +1,123 @@
+import struct
+from array import array
+from collections import Counter
+
+from parser.ll1_table import DenseParseTable
+
+COMPRESSED_MAGIC = b'TLAT'
+COMPRESSED_VERSION = 1
+_HEADER = struct.Struct('<4sHIII')
+
+
+class CompressedParseTable:
+    """
+    Row-displacement ("comb vector") compression of a DenseParseTable.
+
+    Every non-terminal row gets a default production (the one filling most of
+    its cells) and only the cells that differ from it are stored. All rows
+    are overlaid in one `values` vector at per-row displacements chosen so
+    that no two stored cells collide; `check` records which row owns each
+    slot. A lookup is O(1):
+
+        i = displacement[row] + terminal
+        values[i] if check[i] == row else defaults[row]
+
+    With use_defaults=True, error cells may answer with the row default. That
+    delays error detection until the next terminal mismatch but never makes
+    the parser accept invalid input. With use_defaults=False, defaults are
+    always ERROR and every lookup matches the dense table exactly.
+    """
+
+    ERROR = DenseParseTable.ERROR
+
+    def __init__(self, terminal_count, non_terminal_count, defaults, displacement, check, values):
+        self.terminal_count = terminal_count
+        self.non_terminal_count = non_terminal_count
+        self.defaults = defaults
+        self.displacement = displacement
+        self.check = check
+        self.values = values
+
+    @classmethod
+    def from_dense(cls, dense: DenseParseTable, use_defaults=True):
+        width = dense.width
+        rows = []
+        defaults = array('i')
+        for r in range(dense.non_terminal_count):
+            row = dense.cells[r * width:(r + 1) * width]
+            default = cls.ERROR
+            if use_defaults:
+                counts = Counter(v for v in row if v != cls.ERROR)
+                if counts:
+                    default = counts.most_common(1)[0][0]
+            defaults.append(default)
+            rows.append([(t, v) for t, v in enumerate(row) if v != cls.ERROR and v != default])
+
+        displacement = array('i', [0]) * dense.non_terminal_count
+        check = []
+        values = []
+        used = bytearray()
+        # pack the densest rows first; first fit for the rest
+        for r in sorted(range(len(rows)), key=lambda r: -len(rows[r])):
+            entries = rows[r]
+            if not entries:
+                continue
+            t0 = entries[0][0]
+            d = -t0
+            while True:
+                # jump straight to the next displacement where the first entry fits
+                slot = used.find(0, d + t0)
+                d = (slot if slot != -1 else max(len(used), d + t0)) - t0
+                if all(d + t >= len(used) or not used[d + t] for t, _ in entries):
+                    break
+                d += 1
+            needed = d + entries[-1][0] + 1
+            if needed > len(check):
+                check.extend([-1] * (needed - len(check)))
+                values.extend([cls.ERROR] * (needed - len(values)))
+                used.extend(bytes(needed - len(used)))
+            for t, v in entries:
+                used[d + t] = 1
+                check[d + t] = r
+                values[d + t] = v
+            displacement[r] = d
+        return cls(dense.terminal_count, dense.non_terminal_count, defaults, displacement,
+                   array('i', check), array('i', values))
+
+    def lookup(self, nt_id, t_id):
+        r = nt_id - self.terminal_count
+        i = self.displacement[r] + t_id
+        if 0 <= i < len(self.check) and self.check[i] == r:
+            return self.values[i]
+        return self.defaults[r]
+
+    def to_dense(self, grammar):
+        dense = DenseParseTable(grammar)
+        for r in range(self.non_terminal_count):
+            nt_id = r + self.terminal_count
+            for t_id in range(self.terminal_count):
+                dense.set(nt_id, t_id, self.lookup(nt_id, t_id))
+        return dense
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.defaults, self.displacement, self.check, self.values))
+
+    def to_bytes(self):
+        header = _HEADER.pack(COMPRESSED_MAGIC, COMPRESSED_VERSION, self.terminal_count,
+                              self.non_terminal_count, len(self.check))
+        return b''.join([header, self.defaults.tobytes(), self.displacement.tobytes(),
+                         self.check.tobytes(), self.values.tobytes()])
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, terminal_count, non_terminal_count, size = _HEADER.unpack_from(data)
+        if magic != COMPRESSED_MAGIC or version != COMPRESSED_VERSION:
+            raise ValueError("Not a compressed parse table (or unsupported version)")
+        arrays = []
+        offset = _HEADER.size
+        for length in (non_terminal_count, non_terminal_count, size, size):
+            column = array('i')
+            column.frombytes(data[offset:offset + length * column.itemsize])
+            offset += length * column.itemsize
+            arrays.append(column)
+        return cls(terminal_count, non_terminal_count, *arrays)
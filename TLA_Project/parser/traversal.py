@@ -0,0 +1,81 @@
+"""
+Tree walks with an explicit stack, so trees as deep as their input (right
+recursive lists, nested parentheses) never hit the recursion limit. They
+work on anything with a `children` list: ParseTreeNode, CompactNode.
+"""
+
+
+def pre_order(root):
+    """Every node of the tree, parents before their children, left to right."""
+    stack = [root]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node = pop()
+        yield node
+        children = node.children
+        if children:
+            extend(reversed(children))
+
+
+def depth_first(root):
+    """(node, depth) pairs in pre-order; the root has depth 0."""
+    stack = [(root, 0)]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node, depth = pop()
+        yield node, depth
+        children = node.children
+        if children:
+            depth += 1
+            extend((child, depth) for child in reversed(children))
+
+
+def post_order(root):
+    """Every node of the tree, children (left to right) before their parent."""
+    stack = [(root, False)]
+    pop = stack.pop
+    append = stack.append
+    while stack:
+        node, expanded = pop()
+        children = node.children
+        if expanded or not children:
+            yield node
+            continue
+        append((node, True))
+        for child in reversed(children):
+            append((child, False))
+
+
+class TreeVisitor:
+    """
+    Hooks for visit(): enter(node) before a node's children and exit(node)
+    after them. enter() may return False to skip the children (exit() is
+    still called).
+    """
+
+    def enter(self, node):
+        return True
+
+    def exit(self, node):
+        pass
+
+
+def visit(root, visitor):
+    """Call `visitor.enter` and `visitor.exit` for every node, depth-first."""
+    enter = visitor.enter
+    exit_ = visitor.exit
+    stack = [(root, False)]
+    pop = stack.pop
+    append = stack.append
+    while stack:
+        node, leaving = pop()
+        if leaving:
+            exit_(node)
+            continue
+        descend = enter(node) is not False
+        append((node, True))
+        if descend:
+            for child in reversed(node.children):
+                append((child, False))
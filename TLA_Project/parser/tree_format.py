@@ -0,0 +1,368 @@
+"""
+Binary storage of parse trees.
+
+    header     <4s magic 'TLPT'> <H version> <H flags>
+    records    one per node in pre-order: <H symbol> <I child count>
+               <i value index, -1 for none> [<I start> <I end> with FLAG_SPANS]
+    symbols    <I count>, then per symbol <H length> <UTF-8 name>
+    values     <I count> <I offsets[count + 1]> <UTF-8 text of all values>
+    footer     <4s magic> <H version> <H flags> <I nodes> <Q symbols offset>
+               <Q values offset>
+
+All integers are little-endian. Records have a fixed size, so node n is at
+header size + n * record size and a memory-mapped file can be walked (or
+searched) without decoding it. The tables only grow while the records are
+written and go after them, and the footer says where they start, so a file
+is written in one forward pass. Equal token values are stored once.
+
+write_jsonl()/read_jsonl() are a line-per-node JSON version of the same
+records for debugging.
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from parser.dpda_parser import ParseTreeNode
+from parser.traversal import pre_order
+
+TREE_MAGIC = b'TLPT'
+TREE_VERSION = 1
+FLAG_SPANS = 1
+
+_HEADER = struct.Struct('<4sHH')
+_FOOTER = struct.Struct('<4sHHIQQ')
+_RECORD = struct.Struct('<HIi')
+_SPAN_RECORD = struct.Struct('<HIiII')
+_COUNT = struct.Struct('<I')
+_NAME_LENGTH = struct.Struct('<H')
+
+
+class TreeWriter:
+    """
+    Writes the binary format to a binary file object in one pass. Add nodes
+    in pre-order with write_node(), or whole trees with write_tree(), then
+    call close() (which does not close `file`). Records are buffered and
+    written in blocks of about `buffer_size` bytes.
+    """
+
+    def __init__(self, file, spans=False, buffer_size=1 << 16):
+        self.file = file
+        self.spans = spans
+        self.record = _SPAN_RECORD if spans else _RECORD
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.symbol_ids = {}
+        self.value_ids = {}
+        self.nodes = 0
+        self.offset = 0
+        self._write(_HEADER.pack(TREE_MAGIC, TREE_VERSION, FLAG_SPANS if spans else 0))
+
+    def _write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def write_node(self, symbol, value, child_count, start=None, end=None):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_ids)
+        if value is None:
+            value_id = -1
+        else:
+            value_id = self.value_ids.get(value)
+            if value_id is None:
+                value_id = self.value_ids[value] = len(self.value_ids)
+        if self.spans:
+            self.buffer += self.record.pack(symbol_id, child_count, value_id, start or 0, end or 0)
+        else:
+            self.buffer += self.record.pack(symbol_id, child_count, value_id)
+        self.nodes += 1
+        if len(self.buffer) >= self.buffer_size:
+            self._write(self.buffer)
+            self.buffer = bytearray()
+
+    def write_tree(self, root):
+        """Add every node of a ParseTreeNode (or CompactNode) tree."""
+        write_node = self.write_node
+        for node in pre_order(root):
+            write_node(node.symbol, node.value, len(node.children), node.start, node.end)
+
+    def close(self):
+        self._write(self.buffer)
+        self.buffer = bytearray()
+        symbols_offset = self.offset
+        names = [name.encode('utf-8') for name in self.symbol_ids]
+        self._write(_COUNT.pack(len(names)) + b''.join(_NAME_LENGTH.pack(len(n)) + n for n in names))
+        values_offset = self.offset
+        texts = [value.encode('utf-8') for value in self.value_ids]
+        offsets = array('I', [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        self._write(_COUNT.pack(len(texts)) + _little_endian(offsets) + b''.join(texts))
+        self._write(_FOOTER.pack(TREE_MAGIC, TREE_VERSION, FLAG_SPANS if self.spans else 0,
+                                 self.nodes, symbols_offset, values_offset))
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_tree(root, path, spans=None):
+    """Save a tree to `path`; spans default to whether the root has offsets."""
+    if spans is None:
+        spans = root.start is not None
+    with open(path, 'wb') as f:
+        writer = TreeWriter(f, spans)
+        writer.write_tree(root)
+        writer.close()
+
+
+class TreeFile:
+    """
+    Read access to the binary format over bytes or a memory-mapped file
+    (open_tree()). Nodes are addressed by their pre-order number and only
+    decoded when asked for; node(n) gives a ParseTreeNode-like view and
+    to_tree() builds the whole ParseTreeNode tree.
+    """
+
+    def __init__(self, data, closer=None):
+        self.data = memoryview(data)
+        self._closer = closer
+        magic, version, _ = _HEADER.unpack_from(self.data)
+        if magic != TREE_MAGIC or version != TREE_VERSION:
+            raise ValueError("Not a parse tree file (or unsupported version)")
+        magic, version, flags, nodes, symbols_offset, values_offset = _FOOTER.unpack_from(
+            self.data, len(self.data) - _FOOTER.size)
+        if magic != TREE_MAGIC or version != TREE_VERSION:
+            raise ValueError("Truncated parse tree file")
+        self.spans = bool(flags & FLAG_SPANS)
+        self.record = _SPAN_RECORD if self.spans else _RECORD
+        self.nodes = nodes
+        self.records_end = _HEADER.size + nodes * self.record.size
+
+        self.symbols = []
+        offset = symbols_offset
+        count, = _COUNT.unpack_from(self.data, offset)
+        offset += _COUNT.size
+        for _ in range(count):
+            length, = _NAME_LENGTH.unpack_from(self.data, offset)
+            offset += _NAME_LENGTH.size
+            self.symbols.append(bytes(self.data[offset:offset + length]).decode('utf-8'))
+            offset += length
+
+        count, = _COUNT.unpack_from(self.data, values_offset)
+        offset = values_offset + _COUNT.size
+        self.value_offsets = array('I')
+        self.value_offsets.frombytes(self.data[offset:offset + (count + 1) * 4])
+        if sys.byteorder == 'big':
+            self.value_offsets.byteswap()
+        self.values_start = offset + (count + 1) * 4
+        self._values = {}
+        self._stops = None
+
+    def __len__(self):
+        return self.nodes
+
+    def close(self):
+        try:
+            self.data.release()
+        finally:
+            if self._closer is not None:
+                self._closer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_of(self, n):
+        """(symbol, child count, value index[, start, end]) of node n, undecoded."""
+        return self.record.unpack_from(self.data, _HEADER.size + n * self.record.size)
+
+    def records(self, block_size=1 << 16):
+        """
+        All records in pre-order, decoded in one pass. They are copied out
+        about `block_size` bytes at a time, so an unfinished iterator holds
+        no buffer of the file and does not keep close() from unmapping it.
+        """
+        unpack = self.record.iter_unpack
+        data = self.data
+        end = self.records_end
+        step = max(block_size // self.record.size, 1) * self.record.size
+        for offset in range(_HEADER.size, end, step):
+            yield from unpack(data[offset:min(offset + step, end)].tobytes())
+
+    def value(self, index):
+        if index < 0:
+            return None
+        value = self._values.get(index)
+        if value is None:
+            start = self.values_start + self.value_offsets[index]
+            end = self.values_start + self.value_offsets[index + 1]
+            value = self._values[index] = bytes(self.data[start:end]).decode('utf-8')
+        return value
+
+    def walk(self):
+        """(node number, depth, symbol, value) in pre-order, without creating nodes."""
+        symbols = self.symbols
+        value = self.value
+        pending = []  # children still to come for each open ancestor
+        for n, record in enumerate(self.records()):
+            yield n, len(pending), symbols[record[0]], value(record[2])
+            if pending:
+                pending[-1] -= 1
+            if record[1]:
+                pending.append(record[1])
+            while pending and not pending[-1]:
+                pending.pop()
+
+    def subtree_stop(self, n):
+        """
+        One past the last node of the subtree at n. The first call computes
+        the stops of all nodes in one pass over the records (4 bytes a node).
+        """
+        if self._stops is None:
+            stops = array('I', bytes(4 * self.nodes))
+            open_nodes = []  # (node, children still to come)
+            for m, record in enumerate(self.records()):
+                if open_nodes:
+                    open_nodes[-1][1] -= 1
+                open_nodes.append([m, record[1]])
+                while open_nodes and not open_nodes[-1][1]:
+                    stops[open_nodes.pop()[0]] = m + 1
+            self._stops = stops
+        return self._stops[n]
+
+    def node(self, n=0):
+        return StoredNode(self, n)
+
+    @property
+    def root(self):
+        return StoredNode(self, 0) if self.nodes else None
+
+    def to_tree(self):
+        """The stored tree as ParseTreeNode objects."""
+        symbols = self.symbols
+        value = self.value
+        spans = self.spans
+        root = None
+        open_nodes = []  # [node, children still to come]
+        for record in self.records():
+            node = ParseTreeNode(symbols[record[0]], value(record[2]))
+            if spans:
+                node.start, node.end = record[3], record[4]
+            if open_nodes:
+                parent = open_nodes[-1]
+                parent[0].children.append(node)
+                parent[1] -= 1
+                if not parent[1]:
+                    open_nodes.pop()
+            else:
+                root = node
+            if record[1]:
+                open_nodes.append([node, record[1]])
+        return root
+
+
+class StoredNode:
+    """ParseTreeNode-like view of one node of a TreeFile."""
+
+    __slots__ = ('file', 'index')
+
+    def __init__(self, file, index):
+        self.file = file
+        self.index = index
+
+    def __repr__(self):
+        return f"StoredNode({self.symbol!r}, {self.value!r})"
+
+    @property
+    def symbol(self):
+        return self.file.symbols[self.file.record_of(self.index)[0]]
+
+    @property
+    def value(self):
+        return self.file.value(self.file.record_of(self.index)[2])
+
+    @property
+    def children(self):
+        file = self.file
+        count = file.record_of(self.index)[1]
+        children = []
+        child = self.index + 1
+        for _ in range(count):
+            children.append(StoredNode(file, child))
+            child = file.subtree_stop(child)
+        return children
+
+    @property
+    def start(self):
+        return self.file.record_of(self.index)[3] if self.file.spans else None
+
+    @property
+    def end(self):
+        return self.file.record_of(self.index)[4] if self.file.spans else None
+
+
+def open_tree(path):
+    """Memory-map a tree file; close the TreeFile (or use it in a with block) when done."""
+    f = open(path, 'rb')
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+
+    def close():
+        try:
+            mapped.close()
+        finally:
+            f.close()
+    return TreeFile(mapped, close)
+
+
+def load_tree(path):
+    """Read a whole tree file into ParseTreeNode objects."""
+    with open(path, 'rb') as f:
+        return TreeFile(f.read()).to_tree()
+
+
+def write_jsonl(root, file):
+    """Write a tree to a text file as JSON lines: a header, then one object per node in pre-order."""
+    file.write(json.dumps({'format': 'tla-tree', 'version': TREE_VERSION}) + '\n')
+    for node in pre_order(root):
+        record = {'symbol': node.symbol, 'children': len(node.children)}
+        if node.value is not None:
+            record['value'] = node.value
+        if node.start is not None:
+            record['start'] = node.start
+            record['end'] = node.end
+        file.write(json.dumps(record) + '\n')
+
+
+def read_jsonl(file):
+    """Rebuild the ParseTreeNode tree written by write_jsonl()."""
+    header = json.loads(file.readline())
+    if header.get('format') != 'tla-tree' or header.get('version') != TREE_VERSION:
+        raise ValueError("Not a JSON-lines parse tree (or unsupported version)")
+    root = None
+    open_nodes = []
+    for line in file:
+        record = json.loads(line)
+        node = ParseTreeNode(record['symbol'], record.get('value'), record.get('start'), record.get('end'))
+        if open_nodes:
+            parent = open_nodes[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+            if not parent[1]:
+                open_nodes.pop()
+        else:
+            root = node
+        if record['children']:
+            open_nodes.append([node, record['children']])
+    return root
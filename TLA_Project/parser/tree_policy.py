@@ -0,0 +1,76 @@
+class TreePolicy:
+    """
+    Decides which non-terminal nodes build_tree() creates, so that a
+    compact tree comes straight out of the parse instead of from a pass over
+    the full parse tree.
+
+    inline        non-terminals never given a node of their own: their
+                  children go to the nearest node that is kept
+    flatten       right-recursive list non-terminals (`A -> x A | eps`): an
+                  A nested directly in an A is inlined, so the list becomes
+                  one A node with all the items as children
+    drop_empty    True to drop every non-terminal node that ends up without
+                  children (the `A -> eps` nodes), False to keep them, or a
+                  collection of the non-terminals to drop
+
+    The root is always kept. Use for_grammar() for a policy derived from the
+    grammar, and adjust its sets for single non-terminals.
+    """
+
+    def __init__(self, inline=(), flatten=(), drop_empty=True):
+        self.inline = set(inline)
+        self.flatten = set(flatten)
+        self.drop_empty = drop_empty
+
+    @classmethod
+    def for_grammar(cls, grammar, inline_helpers=True, drop_empty=True):
+        """
+        Flatten every non-terminal with a production ending in itself. With
+        inline_helpers=True, also inline the helper lists that LL(1) left
+        recursion removal introduces (`E -> T E'`, `E' -> + T E' | eps`):
+        list non-terminals only ever used as the last symbol of one other
+        non-terminal's productions. Expressions then come out as
+        Expression(Term PLUS Term ...) rather than a nested E' chain.
+        """
+        flatten = set()
+        for head, body in zip(grammar.production_heads, grammar.production_bodies):
+            if body and body[-1] == head:
+                flatten.add(grammar.symbols[head])
+        inline = set()
+        if inline_helpers:
+            users = {}
+            for head, body in zip(grammar.production_heads, grammar.production_bodies):
+                for i, sym in enumerate(body):
+                    if sym == head:
+                        continue
+                    users.setdefault(grammar.symbols[sym], set()).add((grammar.symbols[head], i == len(body) - 1))
+            for name in flatten:
+                used = users.get(name, set())
+                if name != grammar.start_symbol and len(used) == 1 and next(iter(used))[1]:
+                    inline.add(name)
+        return cls(inline, flatten - inline, drop_empty)
+
+    def hooks(self):
+        """
+        The (keeps, drops) pair build_tree() consults: keeps(name, enclosing)
+        says whether a non-terminal entered inside `enclosing` (the symbol of
+        the innermost open non-terminal) gets a node of its own, and
+        drops(name) whether a non-root node left without children is removed.
+        """
+        inline = frozenset(self.inline)
+        flatten = frozenset(self.flatten - inline)
+        drop_empty = self.drop_empty
+        if drop_empty is True or drop_empty is False:
+            drop_all = drop_empty
+            drop = frozenset()
+        else:
+            drop_all = False
+            drop = frozenset(drop_empty)
+
+        def keeps(name, enclosing):
+            return name not in inline and (name != enclosing or name not in flatten)
+
+        def drops(name):
+            return drop_all or name in drop
+
+        return keeps, drops
@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+
+from parser.batch import ParseResult
+from server.protocol import (OK, OPS, decode_error, decode_response, decode_tokens, decode_tree, encode_request,
+                             frame, read_frame)
+
+
+class ParseClient:
+    """
+    asyncio client for server/parse_server.py. Any number of request()
+    calls may be awaited concurrently on one connection: they are pipelined
+    and matched to their responses by request ID.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.waiting = {}
+        self.receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, path=None, host='127.0.0.1', port=7700):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                payload = await read_frame(self.reader)
+                if payload is None:
+                    break
+                request_id, status, body = decode_response(payload)
+                future = self.waiting.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, body))
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            error = e
+        else:
+            error = ConnectionError("Connection closed by the server")
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(error)
+        self.waiting.clear()
+
+    async def request(self, op, grammar, source):
+        """(status, body) for one request; op is 'tokenize', 'parse' or 'recognize'."""
+        request_id = next(self.ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(frame(encode_request(request_id, OPS[op], grammar, source)))
+        await self.writer.drain()
+        return await future
+
+    async def tokenize(self, grammar, source):
+        """The TokenStream of `source`, or a failed ParseResult."""
+        status, body = await self.request('tokenize', grammar, source)
+        if status != OK:
+            return self._failure(body)
+        return decode_tokens(body, source)[0]
+
+    async def parse(self, grammar, source, recognize=False):
+        """A ParseResult with a CompactTree (none when recognize=True)."""
+        status, body = await self.request('recognize' if recognize else 'parse', grammar, source)
+        if status != OK:
+            return self._failure(body)
+        return ParseResult(0, True, tree=None if recognize else decode_tree(body, source))
+
+    @staticmethod
+    def _failure(body):
+        error_index, offset, line, column, message = decode_error(body)
+        return ParseResult(0, False, error=message, error_index=error_index,
+                           offset=offset, line=line, column=column)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self.receiver
@@ -0,0 +1,81 @@
+"""
+Load generator for server/parse_server.py: keeps `--depth` requests in
+flight on each of `--connections` connections and reports requests per
+second and latency percentiles.
+
+Run from TLA_Project/ against a running server:
+    python -m server.load_client --unix /tmp/tla.sock --grammar cpp_spec --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.synthetic import cpp_source
+from server.client import ParseClient
+from server.protocol import OK
+
+
+async def run_load(sources, grammar, op='parse', requests=10000, connections=4, depth=16,
+                   path=None, host='127.0.0.1', port=7700):
+    """Send `requests` requests cycling through `sources`; returns (seconds, latencies, failures)."""
+    clients = [await ParseClient.connect(path, host, port) for _ in range(connections)]
+    latencies = []
+    failures = 0
+    remaining = iter(range(requests))
+
+    async def sender(client):
+        nonlocal failures
+        for number in remaining:
+            source = sources[number % len(sources)]
+            start = time.perf_counter()
+            status, _ = await client.request(op, grammar, source)
+            latencies.append(time.perf_counter() - start)
+            if status != OK:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(client) for client in clients for _ in range(depth)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return elapsed, latencies, failures
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Measure parse server throughput and latency.")
+    arguments.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead of TCP")
+    arguments.add_argument('--host', default='127.0.0.1')
+    arguments.add_argument('--port', type=int, default=7700)
+    arguments.add_argument('--grammar', default='cpp_spec', help="grammar name on the server")
+    arguments.add_argument('--op', choices=('parse', 'recognize', 'tokenize'), default='parse')
+    arguments.add_argument('--file', action='append',
+                           help="source file to send (repeatable); default: generated cpp_spec programs")
+    arguments.add_argument('--functions', type=int, default=3, help="functions per generated program")
+    arguments.add_argument('--requests', type=int, default=10000)
+    arguments.add_argument('--connections', type=int, default=4)
+    arguments.add_argument('--depth', type=int, default=16, help="requests in flight per connection")
+    options = arguments.parse_args()
+
+    if options.file:
+        sources = []
+        for name in options.file:
+            with open(name, 'r', encoding='utf-8') as f:
+                sources.append(f.read())
+    else:
+        sources = [cpp_source(options.functions, seed) for seed in range(100)]
+    elapsed, latencies, failures = asyncio.run(run_load(
+        sources, options.grammar, options.op, options.requests, options.connections, options.depth,
+        options.unix, options.host, options.port))
+    latencies.sort()
+    print(f"{len(latencies)} requests over {options.connections} connections x {options.depth} in flight"
+          f" in {elapsed:.2f}s ({failures} failed)")
+    print(f"{len(latencies) / elapsed:.0f} req/s, p50 {percentile(latencies, 0.5) * 1000:.2f}ms,"
+          f" p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Long-running parse server: keeps compiled grammars resident and answers
+tokenize/parse/recognize requests over a Unix socket or localhost TCP
+(wire format in server/protocol.py).
+
+Run from TLA_Project/:
+    python -m server.parse_server ../specs/cpp_spec.txt --unix /tmp/tla.sock
+    python -m server.parse_server ../specs/cpp_spec.txt ../specs/expr_spec.txt --port 7700
+"""
+import argparse
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from lexer.lexer import Lexer, LexerError
+from lexer.positions import LineIndex
+from parser.batch import BatchParser
+from parser.compiled_grammar import load_compiled
+from server.protocol import (BAD_REQUEST, LEXER_ERROR, OK, OP_PARSE, OP_RECOGNIZE, OP_TOKENIZE, SERVER_ERROR,
+                             SYNTAX_ERROR, ProtocolError, decode_request, encode_error, encode_response,
+                             encode_tokens, encode_tree, frame, read_frame, request_id_of)
+
+
+class ParseService:
+    """Handles one request payload with the grammars it was given (name -> CompiledGrammar)."""
+
+    def __init__(self, grammars):
+        self.grammars = grammars
+        self.parsers = {name: BatchParser(compiled, 'tree') for name, compiled in grammars.items()}
+        self.recognizers = {name: BatchParser(compiled, 'recognize') for name, compiled in grammars.items()}
+
+    def handle(self, payload):
+        """
+        The response payload for a request payload, or None when the request
+        is too short to carry an ID to answer with.
+        """
+        try:
+            request_id, op, grammar, source = decode_request(payload)
+        except ProtocolError as e:
+            if e.request_id is None:
+                return None
+            return encode_response(e.request_id, BAD_REQUEST, encode_error(None, None, 0, 0, str(e)))
+        if grammar not in self.grammars:
+            return encode_response(request_id, BAD_REQUEST,
+                                   encode_error(None, None, 0, 0, f"Unknown grammar: {grammar}"))
+        if op == OP_TOKENIZE:
+            lexer = self.grammars[grammar].lexer or Lexer()
+            try:
+                return encode_response(request_id, OK, encode_tokens(lexer.tokenize_columnar(source)))
+            except LexerError as e:
+                line, column = LineIndex(source).line_col(e.offset)
+                return encode_response(request_id, LEXER_ERROR, encode_error(None, e.offset, line, column, str(e)))
+        elif op == OP_PARSE or op == OP_RECOGNIZE:
+            parsers = self.parsers if op == OP_PARSE else self.recognizers
+            result = parsers[grammar].parse_one(0, source)
+            if result.ok:
+                return encode_response(request_id, OK, encode_tree(result.tree) if result.tree else b'')
+        else:
+            return encode_response(request_id, BAD_REQUEST, encode_error(None, None, 0, 0, f"Unknown op: {op}"))
+        status = LEXER_ERROR if result.error_index is None else SYNTAX_ERROR
+        return encode_response(request_id, status, encode_error(result.error_index, result.offset,
+                                                                result.line, result.column, result.error))
+
+
+_service = None
+
+
+def _init_worker(grammars):
+    global _service
+    _service = ParseService(grammars)
+
+
+def _handle_batch(payloads):
+    """Responses for a batch; a request that fails only fails its own response."""
+    handle = _service.handle
+    responses = []
+    for payload in payloads:
+        try:
+            responses.append(handle(payload))
+        except Exception as e:
+            request_id = request_id_of(payload)
+            responses.append(None if request_id is None else encode_response(
+                request_id, SERVER_ERROR, encode_error(None, None, 0, 0, f"Internal error: {e!r}")))
+    return responses
+
+
+class ParseServer:
+    """
+    asyncio front end of a ParseService.
+
+    Requests are read as they arrive and handed to an executor, a process
+    pool of `workers` processes (a thread in this process with workers=0),
+    so the event loop only moves bytes. Every worker gets the compiled
+    grammars once, at startup. Requests waiting for a worker, from any
+    connection, are sent to it together, up to `batch_size` per call, which
+    keeps the per-call IPC cost off small requests.
+
+    A connection may pipeline any number of requests: up to `max_in_flight`
+    of them are queued or parsed at a time and the responses are written
+    back in request order. A request that cannot be answered (no readable
+    ID, or its worker died) closes the connection, which fails the
+    client's outstanding requests instead of leaving them waiting.
+    """
+
+    def __init__(self, grammars, workers=None, max_in_flight=64, batch_size=32):
+        self.grammars = grammars
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.executor = None
+        self.server = None
+        self.requests = None
+        self.dispatcher = None
+        self.connections = set()
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """Listen on the Unix socket `path`, or on host:port (port 0 picks a free one)."""
+        if self.workers == 0:
+            workers = 1
+            self.executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.grammars,))
+        else:
+            workers = self.workers or os.cpu_count() or 1
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(self.grammars,))
+        self.requests = asyncio.Queue()
+        # two batches per worker: one running, one ready to start
+        self.dispatcher = asyncio.create_task(self._dispatch(asyncio.Semaphore(workers * 2)))
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve_connection, path=path)
+        else:
+            self.server = await asyncio.start_server(self._serve_connection, host=host, port=port)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening, drop every open connection and shut the workers down."""
+        self.server.close()
+        connections = list(self.connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.dispatcher.cancel()
+        # waiting for the workers to exit must not block the event loop
+        shutdown = functools.partial(self.executor.shutdown, cancel_futures=True)
+        await asyncio.get_running_loop().run_in_executor(None, shutdown)
+
+    async def _dispatch(self, slots):
+        loop = asyncio.get_running_loop()
+        requests = self.requests
+        while True:
+            await slots.acquire()
+            batch = [await requests.get()]
+            while len(batch) < self.batch_size and not requests.empty():
+                batch.append(requests.get_nowait())
+            done = loop.run_in_executor(self.executor, _handle_batch, [payload for payload, _ in batch])
+            done.add_done_callback(lambda done, batch=batch: self._resolve(slots, batch, done))
+
+    @staticmethod
+    def _resolve(slots, batch, done):
+        slots.release()
+        # an exception here means the worker itself failed (the batch is lost)
+        error = None if done.cancelled() else done.exception()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[i])
+
+    async def _serve_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        pending = asyncio.Queue(self.max_in_flight)
+        responder = asyncio.create_task(self._write_responses(pending, writer))
+        try:
+            try:
+                while True:
+                    payload = await read_frame(reader)
+                    if payload is None:
+                        break
+                    response = loop.create_future()
+                    # blocks while max_in_flight responses are outstanding
+                    await pending.put(response)
+                    self.requests.put_nowait((payload, response))
+            except (ConnectionError, asyncio.IncompleteReadError, ProtocolError):
+                pass
+            await pending.put(None)
+            await responder
+        except asyncio.CancelledError:
+            # close(): drop the requests in flight and hang up. Returning
+            # normally keeps asyncio from reporting the cancelled handler.
+            responder.cancel()
+            writer.close()
+        finally:
+            self.connections.discard(connection)
+
+    @staticmethod
+    async def _write_responses(pending, writer):
+        connected = True
+        while True:
+            response = await pending.get()
+            if response is None:
+                break
+            try:
+                response = await response
+            except Exception:
+                # a worker died; the request ID is lost with it
+                response = None
+            if not connected:
+                continue
+            if response is None:
+                # nothing to answer with: hang up so the client stops waiting
+                connected = False
+                writer.close()
+                continue
+            try:
+                writer.write(frame(response))
+                await writer.drain()
+            except ConnectionError:
+                # keep draining the queue so the reader is never blocked
+                connected = False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def grammar_name(path):
+    """Name requests use for a spec or grammar file: its base name without extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+async def serve(specs, path=None, host='127.0.0.1', port=0, workers=None):
+    grammars = {grammar_name(spec): load_compiled(spec) for spec in specs}
+    server = ParseServer(grammars, workers)
+    await server.start(path, host, port)
+    if path is None:
+        host, port = server.address[:2]
+        path = f"{host}:{port}"
+    print(f"Serving {', '.join(grammars)} on {path}", flush=True)
+    await server.serve_forever()
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Serve tokenize/parse requests for compiled grammars.")
+    arguments.add_argument('specs', nargs='+', help="spec or grammar files; requests name them by base name")
+    arguments.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    arguments.add_argument('--host', default='127.0.0.1')
+    arguments.add_argument('--port', type=int, default=7700)
+    arguments.add_argument('--workers', type=int, default=None,
+                           help="parse processes (default: one per CPU; 0 parses in a thread)")
+    options = arguments.parse_args()
+    try:
+        asyncio.run(serve(options.specs, options.unix, options.host, options.port, options.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
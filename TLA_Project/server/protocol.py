@@ -0,0 +1,203 @@
+"""
+Wire format of the parse server (server/parse_server.py).
+
+Every message is a frame: a little-endian uint32 payload length followed by
+the payload. A connection carries any number of request frames; responses
+come back in request order, each echoing its request ID.
+
+    request    <I id> <B op> <H name length> <grammar name> <UTF-8 source>
+    response   <I id> <B status> <body>
+
+Bodies by op and status:
+
+    OK, OP_TOKENIZE    tokens
+    OK, OP_PARSE       tokens, then tree
+    OK, OP_RECOGNIZE   empty
+    errors             <i token index> <i offset> <I line> <I column> <UTF-8 message>
+                       (-1 when unknown; line/column are 1-based, 0 if unknown)
+
+    tokens     <I size> <kind names, '\\n'-joined> <I count>
+               kinds[count] (uint16), starts[count], ends[count] (uint32)
+    tree       <I size> <symbol names, '\\n'-joined> <I count>
+               symbol[count] (uint16), parent[count], token[count] (int32)
+
+Offsets are character offsets into the request source. The tree columns are
+those of a CompactTree (pre-order, NO_NODE = -1); child links are rebuilt
+from `parent` on decoding. All integers are little-endian.
+"""
+import struct
+import sys
+from array import array
+
+from lexer.token_stream import TokenStream
+from parser.compact_tree import NO_NODE, CompactTree
+
+OP_TOKENIZE = 1
+OP_PARSE = 2
+OP_RECOGNIZE = 3
+OPS = {'tokenize': OP_TOKENIZE, 'parse': OP_PARSE, 'recognize': OP_RECOGNIZE}
+
+OK = 0
+SYNTAX_ERROR = 1
+LEXER_ERROR = 2
+BAD_REQUEST = 3
+SERVER_ERROR = 4
+
+MAX_FRAME = 64 << 20
+
+_LENGTH = struct.Struct('<I')
+_REQUEST = struct.Struct('<IBH')
+_RESPONSE = struct.Struct('<IB')
+_ERROR = struct.Struct('<iiII')
+
+
+class ProtocolError(ValueError):
+    """A malformed frame or request. `request_id` is the request's ID when its header could be read."""
+
+    def __init__(self, message, request_id=None):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def frame(payload):
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    """Payload of the next frame from an asyncio StreamReader, or None at a clean end of stream."""
+    header = await reader.read(_LENGTH.size)
+    if not header:
+        return None
+    if len(header) < _LENGTH.size:
+        header += await reader.readexactly(_LENGTH.size - len(header))
+    length, = _LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return await reader.readexactly(length)
+
+
+def encode_request(request_id, op, grammar, source):
+    name = grammar.encode('utf-8')
+    return _REQUEST.pack(request_id, op, len(name)) + name + source.encode('utf-8')
+
+
+def request_id_of(payload):
+    """The ID of a request payload, or None when it is too short to hold one."""
+    if len(payload) < _REQUEST.size:
+        return None
+    return _REQUEST.unpack_from(payload)[0]
+
+
+def decode_request(payload):
+    """(request_id, op, grammar name, source); raises ProtocolError on a malformed payload."""
+    if len(payload) < _REQUEST.size:
+        raise ProtocolError("Truncated request")
+    request_id, op, name_length = _REQUEST.unpack_from(payload)
+    name_end = _REQUEST.size + name_length
+    try:
+        grammar = payload[_REQUEST.size:name_end].decode('utf-8')
+        source = payload[name_end:].decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise ProtocolError(f"Request is not valid UTF-8: {e}", request_id) from None
+    return request_id, op, grammar, source
+
+
+def encode_response(request_id, status, body=b''):
+    return _RESPONSE.pack(request_id, status) + body
+
+
+def decode_response(payload):
+    """(request_id, status, body)."""
+    request_id, status = _RESPONSE.unpack_from(payload)
+    return request_id, status, payload[_RESPONSE.size:]
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(typecode, data, offset, count):
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    column.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, end
+
+
+def _encode_names(names):
+    text = '\n'.join(names).encode('utf-8')
+    return _LENGTH.pack(len(text)) + text
+
+
+def _read_names(data, offset):
+    size, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    text = bytes(data[offset:offset + size]).decode('utf-8')
+    return (text.split('\n') if text else []), offset + size
+
+
+def encode_tokens(stream: TokenStream):
+    stream.flush()
+    return b''.join([_encode_names(stream.kind_names), _LENGTH.pack(len(stream)),
+                     _little_endian(stream.kinds), _little_endian(stream.starts), _little_endian(stream.ends)])
+
+
+def decode_tokens(body, source, offset=0):
+    """(TokenStream over `source`, offset just past the tokens in `body`)."""
+    names, offset = _read_names(body, offset)
+    count, = _LENGTH.unpack_from(body, offset)
+    offset += _LENGTH.size
+    stream = TokenStream(source, names)
+    stream.kinds, offset = _read_column('H', body, offset, count)
+    stream.starts, offset = _read_column('i', body, offset, count)
+    stream.ends, offset = _read_column('i', body, offset, count)
+    return stream, offset
+
+
+def encode_tree(tree: CompactTree):
+    return b''.join([encode_tokens(tree.tokens), _encode_names(tree.symbols), _LENGTH.pack(len(tree)),
+                     _little_endian(tree.symbol), _little_endian(tree.parent), _little_endian(tree.token)])
+
+
+def decode_tree(body, source):
+    """The CompactTree of a parse response body, with its TokenStream over `source`."""
+    tokens, offset = decode_tokens(body, source)
+    symbols, offset = _read_names(body, offset)
+    count, = _LENGTH.unpack_from(body, offset)
+    offset += _LENGTH.size
+    tree = CompactTree(symbols, tokens)
+    tree.symbol, offset = _read_column('H', body, offset, count)
+    tree.parent, offset = _read_column('i', body, offset, count)
+    tree.token, offset = _read_column('i', body, offset, count)
+    first_child = array('i', [NO_NODE]) * count
+    next_sibling = array('i', [NO_NODE]) * count
+    # pre-order: a node's children appear in order after it
+    last_child = {}
+    for node, parent in enumerate(tree.parent):
+        if parent == NO_NODE:
+            continue
+        previous = last_child.get(parent)
+        if previous is None:
+            first_child[parent] = node
+        else:
+            next_sibling[previous] = node
+        last_child[parent] = node
+    tree.first_child = first_child
+    tree.next_sibling = next_sibling
+    return tree
+
+
+def encode_error(error_index, offset, line, column, message):
+    return _ERROR.pack(-1 if error_index is None else error_index, -1 if offset is None else offset,
+                       line or 0, column or 0) + message.encode('utf-8')
+
+
+def decode_error(body):
+    """(token index or None, offset or None, line, column, message)."""
+    error_index, offset, line, column = _ERROR.unpack_from(body)
+    message = bytes(body[_ERROR.size:]).decode('utf-8')
+    return (None if error_index < 0 else error_index, None if offset < 0 else offset, line, column, message)
@@ -0,0 +1,163 @@
+"""
+IncrementalParser and IncrementalLexer against parsing and lexing the edited
+text from scratch.
+
+Run from TLA_Project/:  python -m unittest discover tests  (or python -m pytest tests)
+"""
+import os
+import random
+import unittest
+
+from lexer.incremental import IncrementalLexer
+from lexer.lexer import Lexer, LexerError
+from parser.compiled_grammar import CompiledGrammar
+from parser.incremental_parse import IncrementalParser
+from parser.traversal import pre_order
+
+SPECS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'specs')
+
+SOURCE = """function f() { x = 1; if (x) { y = x + 2; } return y; }
+function g() { while (z) { z = z - 1; } }
+function h() { return 3; }
+"""
+
+
+def compile_spec(name):
+    with open(os.path.join(SPECS, name), 'r', encoding='utf-8') as f:
+        return CompiledGrammar(f.read())
+
+
+def dump(root):
+    return [(node.symbol, node.value, node.start, node.end, len(node.children)) for node in pre_order(root)]
+
+
+class IncrementalParserTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cpp = compile_spec('cpp_spec.txt')
+        cls.parser = cls.cpp.parser()
+
+    def setUp(self):
+        self.incremental = IncrementalParser(self.parser, self.cpp.lexer)
+        self.document = self.incremental.parse(SOURCE)
+
+    def edit(self, offset, deleted, inserted):
+        """Apply the edit and check the document against a full parse of the new text."""
+        document = self.document
+        text = document.source[:offset] + inserted + document.source[offset + deleted:]
+        result = self.incremental.edit(document, offset, deleted, inserted)
+        self.assertEqual(document.source, text)
+        tree, diagnostics = self.parser.parse_with_recovery(self.cpp.lexer.tokenize_columnar(text))
+        self.assertEqual([(d.index, d.message) for d in document.diagnostics],
+                         [(d.index, d.message) for d in diagnostics])
+        self.assertEqual(dump(document.tree), dump(tree), f"after {inserted!r} at {offset}")
+        return result
+
+    def test_insertions(self):
+        position = 0
+        while True:
+            position = self.document.source.find(';', position)
+            if position < 0:
+                break
+            statement = ' w = (w + 10) * 2;'
+            self.assertIsNot(self.edit(position + 1, 0, statement), self.document.tree)
+            position += 1 + len(statement)
+        # typing a number one digit at a time
+        position = self.document.source.index('3;') + 1
+        for digit in '4567':
+            self.assertIsNot(self.edit(position, 0, digit), self.document.tree)
+            position += 1
+
+    def test_deletions(self):
+        for statement in ('x = 1; ', 'y = x + 2; ', 'z = z - 1; ', 'return 3; '):
+            self.edit(self.document.source.index(statement), len(statement), '')
+        self.edit(self.document.source.index('(x)') + 1, 1, 'a + b * c')
+        self.edit(self.document.source.index('a + b * c'), len('a + b * c'), 'q')
+
+    def test_units_added_and_removed(self):
+        self.edit(self.document.source.index('function g'), 0, 'function k() { k = 0; }\n')
+        last = 'function h() { return 3; }\n'
+        self.edit(self.document.source.index(last), len(last), '')
+        self.edit(0, 0, 'function e() { }\n')
+        self.edit(len(self.document.source), 0, 'function i() { return 5; }')
+
+    def test_edit_spanning_two_units(self):
+        # merge f and g: f's body runs on into g's
+        seam = ' }\nfunction g() {'
+        self.edit(self.document.source.index(seam), len(seam), '')
+        # and split them again somewhere else
+        position = self.document.source.index('y = x + 2;')
+        self.edit(position, 0, '} }\nfunction g() { if (y) { ')
+        # replace the end of g and the start of h
+        start = self.document.source.index('return y;')
+        stop = self.document.source.index('return 3;')
+        self.edit(start, stop - start, 'return 0; }\nfunction m() { ')
+
+    def test_syntax_error_and_fix(self):
+        position = self.document.source.index('1;') + 1
+        self.edit(position, 1, '')
+        self.assertTrue(self.document.diagnostics)
+        self.edit(self.document.source.index('z = z'), 0, 'q = 1; ')
+        self.edit(position, 0, ';')
+        self.assertEqual(self.document.diagnostics, [])
+        self.assertIsNot(self.edit(position + 1, 0, ' r = 2;'), self.document.tree)
+
+    def test_lexer_error_leaves_document_unchanged(self):
+        before = dump(self.document.tree)
+        with self.assertRaises(LexerError):
+            self.incremental.edit(self.document, 10, 0, '@')
+        self.assertEqual(self.document.source, SOURCE)
+        self.assertEqual(dump(self.document.tree), before)
+
+
+class IncrementalLexerTest(unittest.TestCase):
+    SNIPPETS = ['x', ' ', 'if', 'while', ' = 1;', '{', '}', '\n', '12', 'function g() { return 3; }\n',
+                'y + 2', '', ';', 'ifx', '8', '.5', 'e+3']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.lexers = [compile_spec('cpp_spec.txt').lexer, Lexer()]
+
+    def assert_same(self, lexer, stream, text):
+        expected = lexer.tokenize_columnar(text)
+        self.assertEqual(str(stream.source), text)
+        self.assertEqual([(stream.kinds[i], stream.start(i), stream.end(i)) for i in range(len(stream))],
+                         [(expected.kinds[i], expected.start(i), expected.end(i)) for i in range(len(expected))])
+        self.assertEqual(list(stream), list(expected))
+
+    def test_random_edits(self):
+        for lexer in self.lexers:
+            rng = random.Random(0)
+            # small windows, so that edits run past them and the window has to grow
+            incremental = IncrementalLexer(lexer, context=4, lookahead=8, window=16)
+            text = SOURCE * 3
+            stream = incremental.tokenize(text)
+            for _ in range(300):
+                offset = rng.randrange(len(text) + 1)
+                deleted = min(rng.choice([0, 0, 1, 2, 5, 30]), len(text) - offset)
+                inserted = rng.choice(self.SNIPPETS) * rng.choice([1, 2])
+                new_text = text[:offset] + inserted + text[offset + deleted:]
+                try:
+                    lexer.tokenize_columnar(new_text)
+                except LexerError:
+                    with self.assertRaises(LexerError):
+                        incremental.apply_edit(stream, offset, deleted, inserted)
+                    self.assert_same(lexer, stream, text)
+                    continue
+                incremental.apply_edit(stream, offset, deleted, inserted)
+                text = new_text
+                self.assert_same(lexer, stream, text)
+
+    def test_changed_range(self):
+        incremental = IncrementalLexer(self.lexers[0])
+        stream = incremental.tokenize(SOURCE)
+        offset = SOURCE.index('x = 1;')
+        _, (first, old_stop, new_stop) = incremental.apply_edit(stream, offset, 1, 'abc + 4')
+        # the token before the edit is re-lexed too; ID "abc" PLUS NUM replace ID "x"
+        self.assertEqual(stream.value(first + 1), 'abc')
+        self.assertEqual(new_stop - old_stop, 2)
+        self.assert_same(self.lexers[0], stream, SOURCE[:offset] + 'abc + 4' + SOURCE[offset + 1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Error recovery of DPDAParser.parse_with_recovery() and CompactTree offsets
+after a recovered parse.
+
+Run from TLA_Project/:  python -m unittest discover tests  (or python -m pytest tests)
+"""
+import os
+import unittest
+
+from lexer.positions import LineIndex
+from parser.compact_tree import CompactTree
+from parser.compiled_grammar import CompiledGrammar
+from parser.traversal import pre_order
+
+SPECS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'specs')
+
+
+def compile_spec(name):
+    with open(os.path.join(SPECS, name), 'r', encoding='utf-8') as f:
+        return CompiledGrammar(f.read())
+
+
+class RecoveryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cpp = compile_spec('cpp_spec.txt')
+        cls.expr = compile_spec('expr_spec.txt')
+
+    def recover(self, compiled, source):
+        tokens = compiled.lexer.tokenize_columnar(source)
+        tree, diagnostics = compiled.parser().parse_with_recovery(tokens)
+        return tokens, tree, diagnostics
+
+    def test_errors_in_two_functions(self):
+        source = ("function f() { x = 1 2; y = 3; }\n"
+                  "function g() { z = ; return z; }\n"
+                  "function h() { w = 4; }\n")
+        tokens, tree, diagnostics = self.recover(self.cpp, source)
+        self.assertEqual(len(diagnostics), 2)
+        first, second = diagnostics
+        self.assertEqual((first.kind, first.value), ('NUM', '2'))
+        self.assertEqual(first.skipped, [('NUM', '2')])
+        self.assertEqual((second.kind, second.value), ('SEMICOLON', ';'))
+        self.assertEqual(second.skipped, [])
+        lines = LineIndex(source)
+        self.assertEqual([lines.line_col(d.offset)[0] for d in diagnostics], [1, 2])
+        # every function after the errors is still parsed
+        functions = [node for node in pre_order(tree) if node.symbol == 'Function']
+        self.assertEqual([f.children[1].value for f in functions], ['f', 'g', 'h'])
+
+    def test_leftover_input_names_first_extra_token(self):
+        _, tree, diagnostics = self.recover(self.expr, '1 + ) 2')
+        leftover = diagnostics[-1]
+        self.assertEqual((leftover.kind, leftover.value), ('RIGHT_PAR', ')'))
+        self.assertEqual(leftover.expected, ['$'])
+        self.assertEqual(leftover.skipped, [('RIGHT_PAR', ')'), ('LITERAL', '2')])
+        self.assertEqual(tree.end, len('1 + ) 2'))
+
+    def test_compact_tree_after_recovery(self):
+        source = "function f() { x = 1 2; y = 3; }\nfunction g() { z = ; }"
+        tokens = self.cpp.lexer.tokenize_columnar(source)
+        parser = self.cpp.parser()
+        tree, _ = parser.parse_with_recovery(tokens)
+        # the compact tree has no ERROR nodes (nor the skipped tokens under them)
+        expected = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if node.symbol == 'ERROR':
+                continue
+            expected.append((node.symbol, node.value, node.start, node.end))
+            stack.extend(reversed(node.children))
+        symbols = self.cpp.grammar.symbols
+        compact = CompactTree.from_events(symbols, parser.event_batches(tokens, recover=True), tokens,
+                                          batched=True)
+        self.assertEqual([(compact.node(n).symbol, compact.value_of(n), compact.start_of(n), compact.end_of(n))
+                          for n in range(len(compact))], expected)
+        # values of a one-shot token iterator line up with the tokens after skipped ones
+        values = CompactTree.from_events(symbols, parser.event_batches(iter(list(tokens)), recover=True),
+                                         iter(()), batched=True)
+        self.assertEqual([values.value_of(n) for n in range(len(values))], [value for _, value, _, _ in expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Streaming tokenizers (tokenize_stream()) against tokenize() when the input
+arrives in pieces split at every offset.
+
+Run from TLA_Project/:  python -m unittest discover tests  (or python -m pytest tests)
+"""
+import io
+import os
+import unittest
+
+from lexer.dfa_lexer import DFALexer
+from lexer.lexer import Lexer
+from parser.compiled_grammar import split_spec
+
+SPECS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'specs')
+
+
+class SplitReader:
+    """A text file object whose read() returns text[:split], then the rest (0 < split < len(text))."""
+
+    def __init__(self, text, split):
+        self.pieces = [text[:split], text[split:]]
+
+    def read(self, size=-1):
+        return self.pieces.pop(0) if self.pieces else ''
+
+
+SOURCE = "function f(n) { x = 8if; if (x8) { return 12.5 + n; } while (y) { z = 3; } }"
+# NUM's exponent makes the DFA scan past the end of "12.5" and "7" before it
+# backs off, while "2e-3" only becomes one token once the "3" has been read
+DFA_SOURCE = "function f(n) { x = 8if; if (x8) { return 12.5e+n - 7e * 2e-3; } while (y) { z = 3; } }"
+
+
+class StreamingLexerTest(unittest.TestCase):
+    def assert_seams(self, lexer, text, lookahead=8):
+        expected = lexer.tokenize(text)
+        for split in range(1, len(text)):
+            self.assertEqual(list(lexer.tokenize_stream(SplitReader(text, split), 1 << 16, lookahead)), expected,
+                             f"split at {split}")
+        for size in range(1, len(text) + 1):
+            self.assertEqual(list(lexer.tokenize_stream(io.StringIO(text), size, lookahead)), expected,
+                             f"chunks of {size}")
+
+    def test_regex_lexer_seams(self):
+        self.assert_seams(Lexer(), SOURCE)
+
+    def test_dfa_lexer_seams(self):
+        with open(os.path.join(SPECS, 'cpp_spec.txt'), 'r', encoding='utf-8') as f:
+            _, lexer_text = split_spec(f.read())
+        self.assert_seams(DFALexer.from_lexer_text(lexer_text), DFA_SOURCE)
+
+
+if __name__ == '__main__':
+    unittest.main()
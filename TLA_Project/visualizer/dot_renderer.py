@@ -0,0 +1,121 @@
+import os
+import subprocess
+
+from parser.traversal import pre_order
+
+FORMATS = ('svg', 'png', 'dot')
+
+
+def _quote(text):
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+class DotRenderer:
+    """
+    Writes a parse tree as Graphviz DOT text in one iterative pass, without
+    building a graph object, and optionally runs `dot` on it.
+
+    collapse_epsilon    draw a node that derives nothing, together with the
+                        chain of single-child non-terminals above it, as one
+                        "A > B > eps" node
+    max_depth           draw subtrees below this depth as one summary node
+                        with their node count
+    max_nodes           once this many nodes are drawn, draw each remaining
+                        group of siblings as one summary node
+
+    Summaries cost one walk over the subtrees they replace, so the pass stays
+    linear in the size of the tree.
+    """
+
+    def __init__(self, collapse_epsilon=True, max_depth=None, max_nodes=None, line_index=None):
+        self.collapse_epsilon = collapse_epsilon
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.line_index = line_index
+
+    def _label(self, node):
+        label = node.symbol
+        if node.value is not None:
+            label += f"\n{node.value}"
+        if self.line_index is not None and node.start is not None:
+            line, col = node.location(self.line_index)
+            label += f"\n@{line}:{col}"
+        return _quote(label)
+
+    @staticmethod
+    def _epsilon_chain(node):
+        """Symbols from `node` down to an empty non-terminal through single children, or None."""
+        symbols = []
+        while node.value is None:
+            symbols.append(node.symbol)
+            if not node.children:
+                return symbols
+            if len(node.children) != 1:
+                return None
+            node = node.children[0]
+        return None
+
+    def write_dot(self, root, file, buffer_lines=4096):
+        """Write the DOT text for `root` to a text file object."""
+        write = file.write
+        lines = ['digraph parse_tree {', '  node [shape=ellipse];']
+        max_depth = self.max_depth
+        max_nodes = self.max_nodes
+        drawn = 0
+        # (node, parent ID, depth); siblings are pushed together, so the
+        # rest of a node's siblings sit right above it on the stack
+        stack = [(root, None, 0)]
+        while stack:
+            node, parent_id, depth = stack.pop()
+            node_id = f"n{drawn}"
+            drawn += 1
+            if max_nodes is not None and drawn > max_nodes:
+                group = [node]
+                while stack and stack[-1][1] == parent_id:
+                    group.append(stack.pop()[0])
+                count = sum(1 for subtree in group for _ in pre_order(subtree))
+                label = _quote(f"{len(group)} more subtrees, {count} nodes")
+                lines.append(f"  {node_id} [shape=box, style=dashed, label={label}];")
+            elif max_depth is not None and depth >= max_depth and node.children:
+                count = sum(1 for _ in pre_order(node))
+                label = _quote(f"{node.symbol} ... ({count} nodes)")
+                lines.append(f"  {node_id} [shape=box, style=dashed, label={label}];")
+            else:
+                chain = self._epsilon_chain(node) if self.collapse_epsilon else None
+                if chain is not None:
+                    lines.append(f"  {node_id} [shape=plaintext, label={_quote(' > '.join(chain + ['eps']))}];")
+                else:
+                    lines.append(f"  {node_id} [label={self._label(node)}];")
+                    for child in reversed(node.children):
+                        stack.append((child, node_id, depth + 1))
+            if parent_id is not None:
+                lines.append(f"  {parent_id} -> {node_id};")
+            if len(lines) >= buffer_lines:
+                write('\n'.join(lines) + '\n')
+                lines = []
+        lines.append('}')
+        write('\n'.join(lines) + '\n')
+
+    def render(self, root, filename='parse_tree', format='svg', view=False):
+        """
+        Write `filename`.dot and, for svg or png, run Graphviz's `dot` to
+        produce `filename`.svg/.png. Returns the output path. With view=True
+        the result is opened in a viewer (this needs the graphviz package);
+        the default never opens one.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format: {format} (expected one of {', '.join(FORMATS)})")
+        dot_path = f"{filename}.dot"
+        with open(dot_path, 'w', encoding='utf-8') as f:
+            self.write_dot(root, f)
+        output = dot_path
+        if format != 'dot':
+            output = f"{filename}.{format}"
+            try:
+                subprocess.run(['dot', f'-T{format}', dot_path, '-o', output], check=True)
+            except FileNotFoundError:
+                raise RuntimeError("Graphviz 'dot' executable not found; render with format='dot' instead") from None
+        if view:
+            from graphviz import view as open_viewer
+            open_viewer(os.path.abspath(output))
+        return output
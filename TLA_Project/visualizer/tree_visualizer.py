@@ -1,9 +1,30 @@
 from graphviz import Digraph
 from parser.dpda_parser import ParseTreeNode
+from parser.traversal import TreeVisitor, visit
+
+
+class _GraphBuilder(TreeVisitor):
+    """Adds every node and an edge from its parent, keeping the open ancestors' IDs on a stack."""
+
+    def __init__(self, visualizer):
+        self.visualizer = visualizer
+        self.ids = []
+
+    def enter(self, node):
+        node_id = self.visualizer._add_node(node)
+        if self.ids:
+            self.visualizer.graph.edge(self.ids[-1], node_id)
+        self.ids.append(node_id)
+
+    def exit(self, node):
+        self.ids.pop()
+
+
 class ParseTreeVisualizer:
     def __init__(self):
         self.graph = Digraph(format='png')
         self.node_count = 0
+        self.line_index = None
 
     def _add_node(self, node):
         self.node_count += 1
@@ -11,18 +32,20 @@ class ParseTreeVisualizer:
         label = node.symbol
         if node.value is not None:
             label += f"\n{node.value}"
+        if self.line_index is not None and node.start is not None:
+            line, col = node.location(self.line_index)
+            label += f"\n@{line}:{col}"
         self.graph.node(node_id, label)
         return node_id
 
-    def _build_graph(self, node, parent_id=None):
-        current_id = self._add_node(node)
-        if parent_id:
-            self.graph.edge(parent_id, current_id)
-        for child in node.children:
-            self._build_graph(child, current_id)
+    def _build_graph(self, root):
+        visit(root, _GraphBuilder(self))
 
-    def render(self, root: ParseTreeNode, filename="parse_tree"):
+    def render(self, root: ParseTreeNode, filename="parse_tree", line_index=None, view=True):
+        # for large trees use visualizer.dot_renderer.DotRenderer, which
+        # writes DOT text directly and can collapse subtrees
         self.node_count = 0
+        self.line_index = line_index
         self.graph.clear()
         self._build_graph(root)
-        self.graph.render(filename, view=True)
+        self.graph.render(filename, view=view)
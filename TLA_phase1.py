@@ -199,13 +199,22 @@ class ParseTreeNode:
         self.children = children if children else []
 
     def display(self, level=0):
-        indent = "  " * level
-        if self.value:
-            print(f"{indent}{self.symbol}: {self.value}")
-        else:
-            print(f"{indent}{self.symbol}")
-        for child in self.children:
-            child.display(level + 1)
+        lines = []
+        for node, depth in walk_tree(self):
+            indent = "  " * (level + depth)
+            if node.value:
+                lines.append(f"{indent}{node.symbol}: {node.value}")
+            else:
+                lines.append(f"{indent}{node.symbol}")
+        print('\n'.join(lines))
+
+# پیمایش پیش‌ترتیب با پشته به جای بازگشت: (node, depth) برای هر گره
+def walk_tree(root):
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        stack.extend((child, depth + 1) for child in reversed(node.children))
 
 class DPDAParser:
     def __init__(self, grammar: Grammar, parse_table):
@@ -309,10 +318,9 @@ def rename_identifier(tokens, old_name, new_name):
     return renamed_tokens
 
 def rename_in_parse_tree(node, old_name, new_name):
-    if node.symbol == 'IDENTIFIER' and node.value == old_name:
-        node.value = new_name
-    for child in node.children:
-        rename_in_parse_tree(child, old_name, new_name)
+    for current, _ in walk_tree(node):
+        if current.symbol == 'IDENTIFIER' and current.value == old_name:
+            current.value = new_name
 
 # ------------- مثال استفاده -------------
 
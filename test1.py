@@ -1,5 +1,11 @@
 from collections import defaultdict
+import os
 import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'TLA_Project'))
+from lexer.lexer import iter_matches, regex_matcher
+from parser.artifact_cache import cache_key, load_cached, source_digest
 
 # ----------- SpecParser Class -------------
 class SpecParser:
@@ -346,6 +352,27 @@ class ConfigurableLexer:
             tokens.append((kind, value))
         return tokens
 
+    def tokenize_stream(self, source, chunk_size=1 << 16, lookahead=256):
+        """
+        Generator version of tokenize() for str, file objects and mmaps
+        (see iter_matches() in TLA_Project/lexer/lexer.py). Like tokenize(),
+        it drops SKIP tokens and any text that no rule matches.
+        """
+        match = regex_matcher(self.regex)
+        search = self.regex.search
+
+        def match_or_skip(text, pos):
+            kind, end = match(text, pos)
+            if kind is None:
+                # finditer() in tokenize() resumes at the next match
+                found = search(text, pos)
+                return 'SKIP', found.start() if found else len(text)
+            return kind, end
+
+        for kind, value, _ in iter_matches(match_or_skip, source, chunk_size, lookahead):
+            if kind != 'SKIP':
+                yield (kind, value)
+
 
 from graphviz import Digraph
 # from parser.dpda_parser import ParseTreeNode  # توجه: قبلاً تعریف شده؛ این خط حذف شد
@@ -403,29 +430,45 @@ def parse_lexer(lexer_text):
     return ConfigurableLexer(lexer_rules)
 
 
+def compile_spec(spec_path):
+    """
+    Build (grammar, lexer, helper, table) from a spec file.
+    """
+    parser = SpecParser(spec_path)
+    parser.load_spec()
+    parser.extract_sections()
+    parser.clean_lexer()
+
+    grammar_text = "\n".join(parser.get_grammar())
+    lexer_text = "\n".join(parser.get_lexer())
+
+    grammar = parse_grammar(grammar_text)
+    lexer = parse_lexer(lexer_text)
+    helper = LL1Helper(grammar)
+    table = LL1ParsingTable(grammar, helper.first, helper.follow)
+    return grammar, lexer, helper, table
+
+
+def load_compiled_spec(spec_path, cache_dir=None):
+    """
+    Like compile_spec(), but reuses the artifact cached for this spec content
+    and this version of the script (TLA_Project/parser/artifact_cache.py).
+    """
+    with open(spec_path, "rb") as f:
+        spec = f.read()
+    key = cache_key(spec, source_digest([os.path.abspath(__file__)]))
+    return load_cached(key, lambda: compile_spec(spec_path), cache_dir)
+
+
 # ----------- Main Program -------------
 
 def main():
     try:
         # گام 1: بارگیری فایل spec
         spec_path = input("Enter spec file path: ").strip().strip('"')
-        parser = SpecParser(spec_path)
-        parser.load_spec()
-        parser.extract_sections()
-        parser.clean_lexer()
-
-        # گام 2: استخراج بخش‌های دستور زبان و lexer
-        grammar_text = "\n".join(parser.get_grammar())
-        lexer_text = "\n".join(parser.get_lexer())
-
-
-        # گام 3: ساخت Grammar و Lexer
-        grammar = parse_grammar(grammar_text)
-        lexer = parse_lexer(lexer_text)
 
-        # گام 4: محاسبه First و Follow و ساخت جدول LL(1)
-        helper = LL1Helper(grammar)
-        table = LL1ParsingTable(grammar, helper.first, helper.follow)
+        # گام 2 تا 4: ساخت Grammar، Lexer و جدول LL(1) (یا بارگذاری از cache)
+        grammar, lexer, helper, table = load_compiled_spec(spec_path)
 
         print("\nFirst sets:")
         helper.display_first()